@@ -2,18 +2,1117 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+from scipy.stats import norm, qmc
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+import copy
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
 import warnings
+import weakref
+import zlib
+from urllib.parse import quote
 warnings.filterwarnings('ignore')
 
+# Empreinte du code source, pour invalider les données en cache à chaque modification
+with open(__file__, 'rb') as _source:
+    CODE_VERSION = hashlib.sha256(_source.read()).hexdigest()[:16]
+
+
+def _stream_key(name):
+    """Clé entière stable d'un nom, pour dériver les flux aléatoires"""
+    return zlib.crc32(name.encode('utf-8'))
+
+
+@dataclass(frozen=True)
+class ElectoralCycle:
+    """Années d'un cycle électoral : anchor + k * period, entre first et last
+    
+    extra ajoute des années hors règle (scrutins avancés ou reportés). Le
+    masque d'un horizon se calcule par arithmétique modulaire, sans liste
+    d'années à parcourir, quelle que soit la longueur de l'horizon.
+    """
+    anchor: int
+    period: int
+    first: int = None
+    last: int = None
+    extra: tuple = ()
+    
+    def mask(self, years):
+        """Masque booléen des années du cycle"""
+        mask = (years - self.anchor) % self.period == 0
+        if self.first is not None:
+            mask &= years >= self.first
+        if self.last is not None:
+            mask &= years <= self.last
+        if self.extra:
+            mask |= np.isin(years, self.extra)
+        return mask
+    
+    def shifted(self, offset):
+        """Même cycle décalé de offset années"""
+        return ElectoralCycle(self.anchor + offset, self.period,
+                              None if self.first is None else self.first + offset,
+                              None if self.last is None else self.last + offset,
+                              tuple(year + offset for year in self.extra))
+
+
+# Cycles électoraux de référence
+PRESIDENTIAL_CYCLE = ElectoralCycle(anchor=2002, period=5, first=2002)  # Présidentielles et législatives
+PRE_ELECTION_CYCLE = PRESIDENTIAL_CYCLE.shifted(-1)
+POST_ELECTION_CYCLE = PRESIDENTIAL_CYCLE.shifted(1)
+MUNICIPAL_CYCLE = ElectoralCycle(anchor=2008, period=6, first=2008, extra=(2001,))  # Tous les 6 ans
+
+# Résolutions temporelles acceptées (alias de pandas.Period)
+FREQUENCIES = ('Y', 'Q', 'M', 'W', 'D')
+
+# Modes de tirage du bruit : pseudo-aléatoire par tuiles, ou quasi-Monte Carlo
+# et hypercube latin (scipy.stats.qmc), un point par scénario
+SAMPLINGS = ('random', 'sobol', 'halton', 'lhs')
+HALTON_MAX_DIMENSION = 2000
+
+# Répartition mensuelle des flux saisonniers les années électorales
+# (présidentielle en avril-mai, législatives en juin) ; uniforme sinon
+SEASONAL_PROFILES = {
+    'campagne': np.array([0.06, 0.08, 0.12, 0.18, 0.16, 0.12, 0.04, 0.03, 0.05, 0.06, 0.05, 0.05]),
+}
+
+
+@dataclass(frozen=True)
+class PeriodTable:
+    """Table de régimes par périodes ((début, fin, valeur), ...)
+    
+    Les bornes sont inclusives et None signifie « sans borne ». Comme dans
+    une chaîne if/elif, la première période correspondante l'emporte.
+    """
+    periods: tuple
+    default: float
+    
+    def evaluate(self, years):
+        """Valeurs de la table pour chaque année"""
+        conditions = []
+        for debut, fin, _ in self.periods:
+            condition = np.ones(len(years), dtype=bool)
+            if debut is not None:
+                condition &= years >= debut
+            if fin is not None:
+                condition &= years <= fin
+            conditions.append(condition)
+        return np.select(conditions, [valeur for _, _, valeur in self.periods], self.default)
+
+
+@dataclass(frozen=True)
+class YearTable:
+    """Valeurs ponctuelles {année: valeur}, default pour les autres années"""
+    values: dict
+    default: float = 1.0
+    
+    def evaluate(self, years):
+        """Valeurs de la table pour chaque année"""
+        table_years = np.array(sorted(self.values), dtype=years.dtype)
+        table_values = np.array([self.values[year] for year in table_years], dtype=float)
+        position = np.minimum(np.searchsorted(table_years, years), len(table_years) - 1)
+        found = table_years[position] == years
+        return np.where(found, table_values[position], self.default)
+
+
+@dataclass(frozen=True)
+class CycleTable:
+    """Valeurs par cycle électoral ((cycle, valeur), ...), default hors cycle
+    
+    Si des cycles se chevauchent, le dernier listé l'emporte.
+    """
+    cycles: tuple
+    default: float = 1.0
+    
+    def evaluate(self, years):
+        """Valeurs de la table pour chaque année"""
+        result = np.full(len(years), self.default, dtype=float)
+        for cycle, value in self.cycles:
+            result[cycle.mask(years)] = value
+        return result
+
+
+def _table_values(table, years):
+    """Évalue une table, ou diffuse une constante, sur les années"""
+    if hasattr(table, 'evaluate'):
+        return table.evaluate(years)
+    return np.full(len(years), table, dtype=float)
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    """Spécification déclarative d'une colonne simulée
+    
+    La tendance vaut base (multipliée par config[base_of] si fourni), fois la
+    croissance, fois chaque multiplicateur. La croissance est linéaire en
+    l'indice d'année, 1 + growth_rate * i / growth_period, ou une rampe par
+    décennie à partir de ramp_start ; sans l'un ni l'autre elle vaut 1. Avec
+    compound_rate, la tendance est une trajectoire composée année après
+    année, base * Π(1 + taux). Le bruit multiplicatif a pour écart-type sigma.
+    
+    flow distingue les flux annuels (revenus, dépenses), répartis entre les
+    périodes aux fréquences infra-annuelles, des stocks et ratios, dont le
+    niveau est repris tel quel ; seasonality nomme le profil saisonnier du
+    flux (None pour une répartition uniforme, 'campagne' pour concentrer
+    les années électorales sur les mois de campagne).
+    """
+    column: str
+    base: float = 1.0
+    base_of: str = None
+    growth_rate: object = 0.0
+    growth_period: float = None
+    ramp_start: int = None
+    multipliers: tuple = ()
+    compound_rate: object = None
+    sigma: float = 0.0
+    flow: bool = False
+    seasonality: str = None
+
+
+METRIC_SPECS = (
+    # Données d'adhérents et structure
+    MetricSpec('Adherents', base_of='adherents_base', growth_period=3, sigma=0.08,
+               growth_rate=PeriodTable((
+                   (2002, 2007, 0.15),   # Création et présidence Chirac
+                   (2007, 2012, 0.08),   # Présidence Sarkozy
+                   (2012, 2014, -0.12),  # Après défaite 2012
+                   (2014, 2016, 0.05),   # Préparation primaire
+                   (2017, 2022, -0.18),  # Après défaite 2017
+               ), default=0.03)),        # Reconstruction
+    MetricSpec('Federations_Departementales', base=100, growth_period=4,  # Métropole + outre-mer
+               growth_rate=PeriodTable(((None, 2007, 0.02), (None, 2012, 0.01)), default=-0.005)),
+    MetricSpec('Elus_Locaux', base=50000, growth_period=5, sigma=0.06,  # Maires, conseillers municipaux, etc.
+               growth_rate=PeriodTable(((None, 2007, 0.03), (None, 2014, -0.01)), default=-0.02),
+               multipliers=(CycleTable(((MUNICIPAL_CYCLE, 1.15),)),)),
+    MetricSpec('Elus_Nationaux', base=300, growth_rate=-0.02, growth_period=2, sigma=0.12,  # Députés, sénateurs
+               multipliers=(YearTable({
+                   2002: 1.4, 2007: 1.4,  # Majorité UMP
+                   2012: 0.7,             # Opposition
+                   2017: 0.4,             # LREM majoritaire
+                   2022: 0.6,
+               }),)),
+    
+    # Revenus du parti
+    MetricSpec('Revenus_Total', base_of='budget_base', growth_period=3, sigma=0.10, flow=True,
+               growth_rate=PeriodTable((
+                   (2002, 2007, 0.12),   # Période faste
+                   (2008, 2012, 0.04),   # Crise financière + fin Sarkozy
+                   (2013, 2016, 0.08),   # Préparation primaire
+                   (2017, 2021, -0.10),  # Après défaite
+               ), default=0.05)),        # Reconstruction
+    MetricSpec('Cotisations_Adherents', base=0.25, base_of='budget_base', growth_period=4, sigma=0.08, flow=True,
+               growth_rate=PeriodTable(((None, 2007, 0.10), (None, 2012, 0.03), (None, 2016, 0.06)),
+                                       default=-0.05)),
+    MetricSpec('Dons_Prives', base=0.35, base_of='budget_base', growth_rate=0.05, growth_period=3, sigma=0.15,
+               flow=True, seasonality='campagne',
+               multipliers=(
+                   # Plafonnement des dons et évolution législative
+                   PeriodTable((
+                       (None, 2007, 1.2),  # Avant plafonnement strict
+                       (None, 2012, 0.8),  # Réglementation renforcée
+                       (None, 2017, 0.9),  # Adaptation
+                   ), default=1.1),        # Nouveaux modes de collecte
+                   CycleTable(((PRESIDENTIAL_CYCLE, 1.8),)),  # Cycles électoraux
+               )),
+    MetricSpec('Financement_Public', base=0.30, base_of='budget_base', growth_rate=0.02, growth_period=4,
+               sigma=0.08, flow=True,
+               multipliers=(PeriodTable((  # Dépend des résultats électoraux
+                   (2003, 2008, 1.4),  # Majorité présidentielle
+                   (2012, 2016, 0.7),  # Opposition
+                   (2017, 2021, 0.4),  # Faible représentation
+               ), default=0.6),)),     # 2022-2025
+    MetricSpec('Revenus_Evenements', base=0.05, base_of='budget_base', growth_rate=0.03, growth_period=3,
+               sigma=0.12, flow=True,
+               # Années de congrès ou universités d'été importantes
+               multipliers=(YearTable(dict.fromkeys([2002, 2004, 2006, 2010, 2014, 2016, 2021], 1.6)),)),
+    MetricSpec('Revenus_Formations', base=0.03, base_of='budget_base', growth_rate=0.06, ramp_start=2010,
+               sigma=0.10, flow=True),  # Développement des formations
+    MetricSpec('Emprunts', base=0.02, base_of='budget_base', growth_rate=0.01, growth_period=4, sigma=0.20,
+               flow=True, seasonality='campagne',
+               multipliers=(CycleTable((
+                   (replace(POST_ELECTION_CYCLE, last=2018), 1.5),  # Après élections, jusqu'en 2018
+                   (PRESIDENTIAL_CYCLE, 2.5),                       # Années électorales
+               )),)),
+    
+    # Dépenses du parti
+    MetricSpec('Depenses_Total', base=0.95, base_of='budget_base', growth_rate=0.04, growth_period=3,
+               sigma=0.08, flow=True, multipliers=(CycleTable(((PRESIDENTIAL_CYCLE, 1.4),)),)),
+    MetricSpec('Depenses_Personnel', base=0.35, base_of='budget_base', growth_period=4, sigma=0.06, flow=True,
+               growth_rate=PeriodTable((
+                   (None, 2012, 0.05),  # Structure importante
+               ), default=-0.02)),      # Rationalisation
+    MetricSpec('Depenses_Campagnes', base=0.25, base_of='budget_base', growth_rate=0.03, growth_period=3,
+               sigma=0.25, flow=True, seasonality='campagne',
+               multipliers=(CycleTable((
+                   (PRE_ELECTION_CYCLE, 1.8),  # Années pré-électorales
+                   (PRESIDENTIAL_CYCLE, 3.0),  # Années électorales
+               ), default=0.5),)),
+    MetricSpec('Depenses_Communication', base=0.15, base_of='budget_base', growth_rate=0.07, ramp_start=2010,
+               sigma=0.12, flow=True),  # Importance croissante de la communication
+    MetricSpec('Depenses_Fonctionnement', base=0.12, base_of='budget_base', growth_rate=0.02, growth_period=4,
+               sigma=0.05, flow=True),
+    MetricSpec('Depenses_Formation', base=0.05, base_of='budget_base', growth_rate=0.05, ramp_start=2008,
+               sigma=0.10, flow=True),  # Développement de l'offre de formation
+    MetricSpec('Remboursements_Emprunts', base=0.03, base_of='budget_base', growth_rate=0.08, ramp_start=2010,
+               sigma=0.15, flow=True),  # Accumulation de la dette
+    
+    # Indicateurs financiers : niveau donné directement par le multiplicateur
+    MetricSpec('Taux_Execution_Budget', sigma=0.04,
+               multipliers=(PeriodTable((
+                   (None, 2005, 0.85),
+                   (None, 2012, 0.88),
+                   (None, 2017, 0.82),  # Difficultés financières
+               ), default=0.87),)),
+    MetricSpec('Ratio_Cotisations_Revenus', sigma=0.05,
+               multipliers=(PeriodTable(((None, 2007, 0.28), (None, 2012, 0.25), (None, 2017, 0.22)),
+                                        default=0.18),)),  # Baisse de la part des cotisations
+    MetricSpec('Dependance_Financement_Public', sigma=0.06,
+               multipliers=(PeriodTable((
+                   (None, 2007, 0.25),  # Moins dépendant (dons importants)
+                   (None, 2012, 0.32),
+                   (None, 2017, 0.45),  # Plus dépendant
+               ), default=0.38),)),
+    MetricSpec('Solde_Financier', sigma=0.10,
+               multipliers=(CycleTable((
+                   (PRESIDENTIAL_CYCLE, -0.15),  # Déficits électoraux
+                   (POST_ELECTION_CYCLE, 0.08),  # Redressement
+               ), default=0.02),)),              # Équilibre
+    MetricSpec('Endettement', base=0.5, base_of='budget_base', sigma=0.08,
+               compound_rate=CycleTable((
+                   (PRESIDENTIAL_CYCLE, 0.25),            # Augmentation dette
+                   (PRESIDENTIAL_CYCLE.shifted(2), -0.10),  # Réduction dette
+               ), default=0.02)),
+    
+    # Investissements stratégiques
+    MetricSpec('Investissement_Communication', base=0.08, base_of='budget_base', growth_rate=0.09,
+               ramp_start=2010, sigma=0.14, flow=True),
+    MetricSpec('Investissement_Numérique', base=0.06, base_of='budget_base', growth_rate=0.12,
+               ramp_start=2012, sigma=0.18, flow=True),
+    MetricSpec('Investissement_Formation', base=0.04, base_of='budget_base', growth_rate=0.06,
+               ramp_start=2008, sigma=0.12, flow=True),
+    MetricSpec('Investissement_Recherche', base=0.03, base_of='budget_base', growth_rate=0.05,
+               ramp_start=2015, sigma=0.15, flow=True),
+    MetricSpec('Investissement_International', base=0.02, base_of='budget_base', growth_rate=0.04,
+               ramp_start=2010, sigma=0.20, flow=True),
+)
+
+
+class CompiledMetrics:
+    """Noyaux vectorisés compilés à partir d'une liste de MetricSpec
+    
+    Les métriques sont regroupées par forme de croissance : chaque groupe, et
+    chaque rang de multiplicateur, est évalué en une opération sur une
+    matrice (années, métriques) au lieu d'une boucle par colonne.
+    """
+    
+    def __init__(self, specs):
+        self.specs = tuple(specs)
+        self.columns = tuple(spec.column for spec in self.specs)
+        self.sigmas = np.array([spec.sigma for spec in self.specs], dtype=float)
+        
+        self.linear = np.flatnonzero([spec.growth_period is not None for spec in self.specs])
+        self.linear_periods = np.array([self.specs[j].growth_period for j in self.linear], dtype=float)
+        self.ramp = np.flatnonzero([spec.ramp_start is not None for spec in self.specs])
+        self.ramp_starts = np.array([self.specs[j].ramp_start for j in self.ramp])
+        self.compound = np.flatnonzero([spec.compound_rate is not None for spec in self.specs])
+        self.n_multipliers = max((len(spec.multipliers) for spec in self.specs), default=0)
+        
+        # Répartition infra-annuelle : profil 0 uniforme, puis SEASONAL_PROFILES
+        unknown = {spec.seasonality for spec in self.specs} - {None, *SEASONAL_PROFILES}
+        if unknown:
+            raise ValueError(f"profil saisonnier inconnu: {', '.join(sorted(unknown))}")
+        self.flow = np.array([spec.flow for spec in self.specs], dtype=bool)
+        profile_names = [None, *SEASONAL_PROFILES]
+        self.profile_index = np.array([profile_names.index(spec.seasonality) for spec in self.specs])
+        self._last_trend = (None, None)
+    
+    def _table_matrix(self, years, tables):
+        """Matrice (années, len(tables)) des tables évaluées"""
+        return np.stack([_table_values(table, years) for table in tables], axis=-1)
+    
+    def trend(self, years, config, origin=None, level=None):
+        """Tendance déterministe (sans bruit) de forme (années, métriques)
+        
+        origin est l'année d'indice 0 de la croissance linéaire (years[0] par
+        défaut) ; level donne, pour les colonnes composées, le niveau atteint
+        l'année précédant years[0] (la base par défaut). Les deux permettent
+        de prolonger un horizon sans recalculer les années déjà générées.
+        
+        La dernière tendance calculée est conservée (en lecture seule) : les
+        générations successives sur un même horizon, par lots de scénarios ou
+        par morceaux, ne réévaluent ni les tables ni les cycles électoraux.
+        """
+        base = self.base_vector(config)
+        origin = years[0] if origin is None and len(years) else origin
+        level = base[self.compound] if level is None else np.asarray(level, dtype=float)
+        key = (years.tobytes(), base.tobytes(), origin, level.tobytes())
+        if self._last_trend[0] == key:
+            return self._last_trend[1]
+        
+        trend = self.trend_from_base(years, base, origin, level)
+        trend.flags.writeable = False
+        self._last_trend = (key, trend)
+        return trend
+    
+    def base_vector(self, config):
+        """Niveaux de base des métriques pour une configuration de parti"""
+        return np.array([config[spec.base_of] * spec.base if spec.base_of else spec.base
+                         for spec in self.specs], dtype=float)
+    
+    def trend_from_base(self, years, base, origin, level=None):
+        """Tendance de forme (..., années, métriques) pour des bases (..., métriques)
+        
+        Une base de forme (partis, métriques) donne les tendances de tous les
+        partis en une passe : croissance et multiplicateurs ne dépendent que
+        des années et sont diffusés le long de l'axe des partis. origin
+        (scalaire ou de forme (...,)) et level (de forme (..., composées))
+        peuvent différer d'un parti à l'autre : les trajectoires composées
+        partent de level l'année origin et restent à level avant.
+        """
+        base = np.asarray(base, dtype=float)
+        level = base[..., self.compound] if level is None else np.asarray(level, dtype=float)
+        origin = np.asarray(origin)[..., None]
+        
+        growth = np.ones(np.broadcast_shapes(origin.shape, years.shape) + (len(self.specs),))
+        if self.linear.size:
+            rates = self._table_matrix(years, [self.specs[j].growth_rate for j in self.linear])
+            growth[..., self.linear] = 1 + rates * ((years - origin)[..., None] / self.linear_periods)
+        if self.ramp.size:
+            rates = self._table_matrix(years, [self.specs[j].growth_rate for j in self.ramp])
+            elapsed = years[:, None] - self.ramp_starts
+            growth[..., self.ramp] = np.where(elapsed >= 0, 1 + rates * np.maximum(0, elapsed/10), 1)
+        
+        trend = base[..., None, :] * growth
+        for k in range(self.n_multipliers):
+            trend *= self._table_matrix(years, [spec.multipliers[k] if k < len(spec.multipliers) else 1.0
+                                                for spec in self.specs])
+        
+        if self.compound.size:
+            rates = self._table_matrix(years, [self.specs[j].compound_rate for j in self.compound])
+            started = years >= origin
+            if not started.all():
+                # Un taux nul (facteur 1 exact) avant origin : la trajectoire y reste à level
+                rates = np.where(started[..., None], rates, 0.0)
+            rates = np.broadcast_to(rates, level.shape[:-1] + rates.shape[-2:])
+            trend[..., self.compound] = compound_paths(level[..., None, :], rates)
+        return trend
+
+
+def compound_paths(base, change_rate):
+    """Trajectoires composées base * Π(1 + taux) le long de l'axe des années
+    
+    change_rate est de forme (..., années, métriques), par exemple un lot
+    (scénarios, années, métriques), et base de forme (métriques,) ou
+    diffusable vers (..., 1, métriques). Un seul cumprod remplace la
+    récurrence année par année ; la base est placée en tête de l'axe pour
+    reproduire exactement l'ordre des multiplications de la récurrence.
+    """
+    factors = 1 + np.asarray(change_rate, dtype=float)
+    head = np.broadcast_to(base, factors.shape[:-2] + (1, factors.shape[-1]))
+    return np.cumprod(np.concatenate([head, factors], axis=-2), axis=-2)[..., 1:, :]
+
+
+def shock_factors(years, columns, shock_lists):
+    """Facteurs multiplicatifs de forme (listes, années, colonnes) de chocs (année, colonne, facteur)
+    
+    shock_lists donne une liste de chocs par parti ; les chocs sur une année
+    hors de years ou une colonne hors de columns sont ignorés, et ceux d'une
+    même case se multiplient.
+    """
+    factors = np.ones((len(shock_lists), len(years), len(columns)))
+    column_index = {column: j for j, column in enumerate(columns)}
+    shocks = [(p, year, column_index[column], factor)
+              for p, shock_list in enumerate(shock_lists)
+              for year, column, factor in shock_list
+              if column in column_index]
+    if shocks and len(years):
+        parties, shock_years, shock_columns, shock_factors = (np.array(v) for v in zip(*shocks))
+        rows = np.searchsorted(years, shock_years)
+        present = (rows < len(years)) & (years[np.minimum(rows, len(years) - 1)] == shock_years)
+        np.multiply.at(factors, (parties[present], rows[present], shock_columns[present]),
+                       shock_factors[present])
+    return factors
+
+class DatasetCache:
+    """Cache disque des jeux de données générés, adressé par contenu
+    
+    Chaque entrée est un fichier .npz non compressé (un tableau par colonne)
+    nommé d'après l'empreinte SHA-256 de sa clé. Une lecture rafraîchit la
+    date d'utilisation de l'entrée ; dès que le cache dépasse max_bytes, les
+    entrées les moins récemment utilisées sont supprimées.
+    
+    Plusieurs processus peuvent partager le répertoire : une entrée supprimée
+    par un autre entre deux opérations est simplement ignorée. Les fichiers
+    .tmp d'écritures en cours comptent dans le budget ; ceux de plus de
+    stale_seconds, laissés par une écriture interrompue, sont supprimés.
+    """
+    
+    def __init__(self, directory='.ump_cache', max_bytes=512 * 2**20, stale_seconds=3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.last_hit = False
+        self.last_key = None
+        os.makedirs(directory, exist_ok=True)
+    
+    def key(self, material):
+        """Empreinte d'un dictionnaire de paramètres sérialisable en JSON"""
+        text = json.dumps(material, sort_keys=True, ensure_ascii=False, default=repr)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+    
+    def get(self, key):
+        """Données en cache pour key, ou None"""
+        self.last_key = key
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                data = self._decode(archive)
+        except FileNotFoundError:
+            self.last_hit = False
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # évincée par un autre processus après la lecture
+        self.last_hit = True
+        return data
+    
+    def put(self, key, data):
+        """Enregistre un DataFrame ou un tableau, puis applique le budget de taille"""
+        self.last_key = key
+        arrays = self._encode(data)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                np.savez(tmp, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._unlink(tmp_path)
+            raise
+        self._evict()
+    
+    def _encode(self, data):
+        """Tableaux à écrire pour un DataFrame (une entrée par colonne) ou un tableau"""
+        if isinstance(data, pd.DataFrame):
+            arrays = {f'col_{i}': data[column].to_numpy() for i, column in enumerate(data.columns)}
+            arrays['__columns__'] = np.array(data.columns, dtype=str)
+            return arrays
+        return {'__values__': np.asarray(data)}
+    
+    def _decode(self, archive):
+        if '__values__' in archive.files:
+            return archive['__values__']
+        columns = archive['__columns__']
+        return pd.DataFrame({column: archive[f'col_{i}'] for i, column in enumerate(columns)})
+    
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(('.npz', '.tmp')):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith('.npz'):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            elif now - stat.st_mtime > self.stale_seconds:
+                self._unlink(entry.path)
+                continue
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._unlink(path)
+            total -= size
+    
+    def _unlink(self, path):
+        """Supprime path, sauf si un autre processus l'a déjà fait"""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _arrow_table(df):
+    """Table pyarrow d'un DataFrame (pyarrow n'est requis que pour les formats colonnaires)"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("les formats parquet, feather et arrow nécessitent pyarrow") from None
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write_csv(df, path, compression=None, **options):
+    if compression == 'zstd' or (compression is None and path.endswith('.zst')):
+        # pandas demanderait le paquet zstandard : pyarrow compresse le flux
+        import pyarrow as pa
+        with pa.output_stream(path, compression='zstd') as sink:
+            df.to_csv(sink, index=False, mode='wb')
+    else:
+        df.to_csv(path, index=False, compression=compression or 'infer')
+
+
+def _write_parquet(df, path, compression=None, row_group_size=65536, **options):
+    import pyarrow.parquet as pq
+    pq.write_table(_arrow_table(df), path, compression=compression or 'zstd',
+                   row_group_size=row_group_size, write_statistics=True)
+
+
+def _write_feather(df, path, compression=None, **options):
+    import pyarrow.feather as feather
+    feather.write_feather(_arrow_table(df), path, compression=compression or 'zstd')
+
+
+def _write_arrow(df, path, compression=None, **options):
+    import pyarrow as pa
+    table = _arrow_table(df)
+    write_options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=write_options) as writer:
+        writer.write_table(table)
+
+
+# Formats d'export : nom -> (extension, fonction d'écriture). Ajouter un
+# format revient à enregistrer ici une fonction (df, path, compression, **options).
+DATASET_WRITERS = {
+    'csv': ('.csv', _write_csv),
+    'parquet': ('.parquet', _write_parquet),
+    'feather': ('.feather', _write_feather),
+    'arrow': ('.arrow', _write_arrow),
+}
+
+
+def _dataset_format(path, format=None):
+    """Format d'un fichier, explicite ou déduit de son extension
+    
+    Seul le CSV se compresse par suffixe (.csv.gz, .csv.zst) ; les formats
+    colonnaires compressent à l'intérieur du fichier.
+    """
+    if format is None:
+        format = next((name for name, (extension, _) in DATASET_WRITERS.items()
+                       if any(path.endswith(extension + suffix)
+                              for suffix in (('', '.gz', '.zst') if name == 'csv' else ('',)))), None)
+    if format not in DATASET_WRITERS:
+        raise ValueError(f"format inconnu pour {path!r} (attendu parmi {', '.join(DATASET_WRITERS)})")
+    return format
+
+
+def write_dataset(df, path, format=None, compression=None, **options):
+    """Écrit df au format donné (ou déduit de l'extension de path)
+    
+    compression est passé au format : 'gzip', 'zstd'... (zstd par défaut
+    pour les formats colonnaires, aucune pour l'IPC Arrow sauf demande). Le
+    Parquet est découpé en groupes de row_group_size lignes avec leurs
+    statistiques min/max : un export en layout long, trié par scénario,
+    permet aux lecteurs d'ignorer les groupes hors des scénarios voulus.
+    """
+    DATASET_WRITERS[_dataset_format(path, format)][1](df, path, compression=compression, **options)
+
+
+def _csv_source(path):
+    """Chemin ou flux d'un CSV, décompressé par pyarrow pour le zstd"""
+    if path.endswith('.zst'):
+        import pyarrow as pa
+        return pa.input_stream(path, compression='zstd')
+    return path
+
+
+def _arrow_dataset(path, format):
+    import pyarrow.dataset as ds
+    return ds.dataset(path, format={'parquet': 'parquet', 'feather': 'feather', 'arrow': 'ipc'}[format])
+
+
+def dataset_columns(path, format=None):
+    """Colonnes d'un export, lues dans son en-tête ou son schéma sans charger les données"""
+    format = _dataset_format(path, format)
+    if format == 'csv':
+        return list(pd.read_csv(_csv_source(path), nrows=0).columns)
+    return list(_arrow_dataset(path, format).schema.names)
+
+
+def read_dataset(path, columns=None, scenarios=None, format=None, dtype=None):
+    """Relit un export, en ne chargeant que columns et les lignes de scenarios
+    
+    Pour les formats colonnaires, seules les colonnes demandées sont lues
+    et le filtre sur Scenario est poussé au lecteur (groupes Parquet
+    écartés d'après leurs statistiques). dtype ({colonne: type}) impose
+    les types au lieu de les laisser inférer ; les types datetime64 sont
+    lus comme dates.
+    """
+    format = _dataset_format(path, format)
+    dtype = dict(dtype or {})
+    if format == 'csv':
+        usecols = None
+        if columns is not None:
+            usecols = list(columns) + (['Scenario'] if scenarios is not None and 'Scenario' not in columns else [])
+        dates = [column for column, kind in dtype.items() if str(kind).startswith('datetime64')
+                 and (usecols is None or column in usecols)]
+        numeric = {column: kind for column, kind in dtype.items() if column not in dates}
+        # round_trip : les flottants écrits en représentation la plus courte sont relus exactement
+        df = pd.read_csv(_csv_source(path), usecols=usecols, dtype=numeric, parse_dates=dates or False,
+                         float_precision='round_trip')
+        if dates:
+            # read_csv choisit sa propre résolution de dates : imposer celle du schéma
+            df = df.astype({column: dtype[column] for column in dates})
+        if scenarios is not None:
+            df = df[df['Scenario'].isin(scenarios)]
+        if columns is not None:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
+    
+    import pyarrow.dataset as ds
+    filter = None if scenarios is None else ds.field('Scenario').isin(list(scenarios))
+    table = _arrow_dataset(path, format).to_table(columns=None if columns is None else list(columns), filter=filter)
+    df = table.to_pandas()
+    return df.astype({column: kind for column, kind in dtype.items() if column in df}) if dtype else df
+
+
+class CsvChunkWriter:
+    """Écrit un CSV ligne à ligne à partir de morceaux de tableaux, compressé à la volée
+    
+    Chaque morceau est formaté par une seule opération de formatage de
+    chaînes (sans passer par DataFrame.to_csv), puis écrit dans un fichier
+    tamponné de buffer_size octets. precision fixe le nombre de chiffres
+    significatifs des flottants (None : représentation exacte la plus
+    courte). compression vaut None, 'gzip' ou 'zstd' (via pyarrow).
+    S'utilise comme gestionnaire de contexte.
+    """
+    
+    def __init__(self, path, key_columns, value_columns, precision=None, compression=None,
+                 buffer_size=1 << 20):
+        if compression == 'gzip':
+            self._file = gzip.open(path, 'wb', compresslevel=6)
+            self._file = io.BufferedWriter(self._file, buffer_size)
+        elif compression == 'zstd':
+            import pyarrow as pa
+            self._file = pa.output_stream(path, compression='zstd', buffer_size=buffer_size)
+        elif compression is None:
+            self._file = open(path, 'wb', buffering=buffer_size)
+        else:
+            raise ValueError(f"compression inconnue: {compression!r} (attendu None, 'gzip' ou 'zstd')")
+        
+        value_format = '%r' if precision is None else f'%.{precision}g'
+        self._row_format = ','.join(['%d'] * len(key_columns) + [value_format] * len(value_columns)) + '\n'
+        self._file.write((','.join([*key_columns, *value_columns]) + '\n').encode('utf-8'))
+    
+    def write(self, keys, values):
+        """Écrit les lignes (clés entières (n, k), valeurs (n, métriques))"""
+        rows = np.column_stack([keys, values]).tolist() if len(values) else []
+        text = (self._row_format * len(rows)) % tuple(value for row in rows for value in row)
+        self._file.write(text.encode('utf-8'))
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PartitionedDataset:
+    """Jeu de données partitionné à la Hive, en ajout seul, avec manifeste
+    
+    Chaque exécution est écrite sous root/party=<parti>/run=<run>/, un
+    fichier par bloc de scénarios (scenario_block=<n>/part.<ext>, layout
+    long). Le répertoire de l'exécution est préparé sous un nom temporaire
+    puis renommé d'un coup : une exécution est entièrement visible ou pas
+    du tout. Son manifeste (root/_manifests/<run>--<parti>.json) liste ses
+    partitions avec leurs plages de scénarios ; il n'est jamais réécrit,
+    si bien que des exécutions concurrentes ne se gênent pas. Les lecteurs
+    élaguent les partitions d'après les manifestes, sans parcourir les
+    fichiers.
+    """
+    
+    def __init__(self, root, format='parquet'):
+        if format not in DATASET_WRITERS:
+            raise ValueError(f"format inconnu: {format!r} (attendu parmi {', '.join(DATASET_WRITERS)})")
+        self.root = root
+        self.format = format
+        self.manifest_dir = os.path.join(root, '_manifests')
+        os.makedirs(self.manifest_dir, exist_ok=True)
+    
+    def write_run(self, analyzer, n_scenarios, run=None, columns=None, chunk_size=None):
+        """Ajoute une exécution de n_scenarios scénarios d'analyzer, renvoie son identifiant"""
+        run = run or datetime.now().strftime('%Y%m%dT%H%M%S')
+        party_key = quote(analyzer.parti, safe='')
+        party_dir = os.path.join(self.root, f'party={party_key}')
+        run_dir = os.path.join(party_dir, f'run={quote(run, safe="")}')
+        if os.path.exists(run_dir):
+            raise ValueError(f"l'exécution {run!r} existe déjà pour {analyzer.parti}")
+        os.makedirs(party_dir, exist_ok=True)
+        
+        chunk_size = chunk_size or analyzer.scenario_block_size
+        extension = DATASET_WRITERS[self.format][0]
+        staging = tempfile.mkdtemp(dir=party_dir, prefix='.run-')
+        partitions = []
+        try:
+            for first, df in zip(range(0, n_scenarios, chunk_size),
+                                 analyzer.iter_scenarios(n_scenarios, chunk_size, layout='long', columns=columns)):
+                block = first // chunk_size
+                block_dir = os.path.join(staging, f'scenario_block={block}')
+                os.makedirs(block_dir)
+                write_dataset(df, os.path.join(block_dir, f'part{extension}'), self.format)
+                partitions.append({
+                    'path': os.path.relpath(os.path.join(run_dir, f'scenario_block={block}', f'part{extension}'),
+                                            self.root),
+                    'scenario_block': block,
+                    'first_scenario': first,
+                    'n_scenarios': int(df['Scenario'].nunique()),
+                    'rows': len(df),
+                })
+            os.rename(staging, run_dir)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        
+        manifest = {
+            'party': analyzer.parti,
+            'run': run,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'format': self.format,
+            'columns': ['Scenario', 'Annee', *analyzer.resolve_columns(columns)],
+            'years': [analyzer.start_year, analyzer.end_year],
+            'seed': analyzer.seed,
+            'partitions': partitions,
+        }
+        manifest_path = os.path.join(self.manifest_dir, f'{quote(run, safe="")}--{party_key}.json')
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifest_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+            json.dump(manifest, tmp, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+        return run
+    
+    def manifests(self):
+        """Manifestes de toutes les exécutions, par ordre d'écriture"""
+        manifests = []
+        for name in sorted(os.listdir(self.manifest_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.manifest_dir, name), encoding='utf-8') as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest['created'])
+    
+    def partitions(self, party=None, run=None, scenarios=None):
+        """Partitions retenues après élagage par parti, exécution et scénarios
+        
+        party et run acceptent une valeur ou une liste ; scenarios une suite
+        de numéros de scénarios. Chaque partition est renvoyée avec le parti
+        et l'exécution de son manifeste.
+        """
+        parties = None if party is None else {party} if isinstance(party, str) else set(party)
+        runs = None if run is None else {run} if isinstance(run, str) else set(run)
+        wanted = None if scenarios is None else np.unique(np.asarray(list(scenarios)))
+        selected = []
+        for manifest in self.manifests():
+            if parties is not None and manifest['party'] not in parties:
+                continue
+            if runs is not None and manifest['run'] not in runs:
+                continue
+            for partition in manifest['partitions']:
+                first, count = partition['first_scenario'], partition['n_scenarios']
+                if wanted is not None and not np.any((wanted >= first) & (wanted < first + count)):
+                    continue
+                selected.append({'party': manifest['party'], 'run': manifest['run'], **partition})
+        return selected
+    
+    def read(self, party=None, run=None, scenarios=None, columns=None):
+        """Lit les partitions retenues en un DataFrame, avec les colonnes Parti et Run en tête"""
+        frames = []
+        for partition in self.partitions(party, run, scenarios):
+            df = read_dataset(os.path.join(self.root, partition['path']), columns, scenarios)
+            df.insert(0, 'Run', partition['run'])
+            df.insert(0, 'Parti', partition['party'])
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=['Parti', 'Run', *(columns or [])])
+        return pd.concat(frames, ignore_index=True)
+
+
+def open_ensemble_store(path):
+    """Rouvre en lecture seule, sans copie, un ensemble écrit par write_ensemble_store
+    
+    Renvoie le tableau (scénario, année, métrique) projeté en mémoire et
+    les métadonnées du fichier JSON associé (colonnes, années...). Les
+    processus qui ouvrent le même fichier partagent le cache de pages du
+    système au lieu de charger chacun leur copie.
+    """
+    with open(path + '.json', encoding='utf-8') as sidecar:
+        metadata = json.load(sidecar)
+    values = np.load(path, mmap_mode='r')
+    if values.shape[-1] != len(metadata['columns']):
+        raise ValueError(f"{path}: {values.shape[-1]} métriques pour {len(metadata['columns'])} colonnes")
+    return values, metadata
+
+
+class MomentAccumulator:
+    """Moyenne et variance en flux (Welford, par lots) pour chaque case d'un tableau
+    
+    update reçoit des lots (n, *shape), par exemple (scénarios, années,
+    métriques) ; merge combine deux accumulateurs tenus par des processus
+    différents (formule de Chan), sans revoir les données.
+    """
+    
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+    
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            self._combine(len(values), values.mean(axis=0), values.var(axis=0) * len(values))
+    
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other._m2)
+    
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self._m2 = self._m2 + m2 + delta**2 * (self.count * count / total)
+        self.count = total
+    
+    @property
+    def variance(self):
+        """Variance empirique (ddof=1)"""
+        return self._m2 / (self.count - 1) if self.count > 1 else np.full(self.mean.shape, np.nan)
+
+
+class QuantileSketch:
+    """Résumé de quantiles en flux de type KLL, fusionnable, pour chaque case d'un tableau
+    
+    Les valeurs sont rangées par niveaux : un élément du niveau h pèse 2**h.
+    Un niveau plein est trié puis compacté (un élément sur deux, décalage
+    tiré au hasard) vers le niveau suivant ; les capacités décroissent d'un
+    facteur 2/3 vers les niveaux bas. Toutes les cases recevant le même
+    nombre de valeurs, chaque niveau est un seul tableau (éléments, *shape)
+    et les compactions sont vectorisées sur toutes les cases. L'erreur de
+    rang est de l'ordre de 1/k, pour une mémoire en O(k) par case quel que
+    soit le nombre de scénarios ; rank_error en donne l'écart-type.
+    """
+    
+    def __init__(self, shape, k=200, seed=None):
+        self.shape = tuple(np.atleast_1d(shape))
+        self.k = k
+        self.count = 0
+        self.levels = []
+        self._rank_variance = 0.0
+        self._rng = np.random.default_rng(seed)
+    
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        self._append(0, values)
+        self._compress()
+    
+    def merge(self, other):
+        self.count += other.count
+        self._rank_variance += other._rank_variance
+        for h, items in enumerate(other.levels):
+            self._append(h, items)
+        self._compress()
+    
+    def _append(self, h, items):
+        while len(self.levels) <= h:
+            self.levels.append(np.empty((0,) + self.shape))
+        self.levels[h] = np.concatenate([self.levels[h], items])
+    
+    def _capacity(self, h):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h))))
+    
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                # Un élément reste au niveau si leur nombre est impair
+                items = np.sort(items, axis=0)
+                even = len(items) - len(items) % 2
+                offset = self._rng.integers(2)
+                # Erreur de rang ±2**h ou nulle, d'espérance nulle, pour toute requête
+                self._rank_variance += 4.0**h
+                self.levels[h] = items[even:]
+                self._append(h + 1, items[offset:even:2])
+            h += 1
+    
+    def quantile(self, q):
+        """Quantiles approchés, de forme (len(q), *shape) (ou shape pour q scalaire)
+        
+        Un sketch vide donne des NaN.
+        """
+        if not self.count:
+            return np.full(np.shape(q) + self.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0**h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, axis=0)
+        items = np.take_along_axis(items, order, axis=0)
+        cumulative = np.cumsum(weights[order], axis=0)
+        targets = np.asarray(q, dtype=float).reshape((-1,) + (1,) * (len(self.shape) + 1)) * cumulative[-1]
+        index = np.minimum((cumulative < targets).sum(axis=1), len(items) - 1)
+        result = np.take_along_axis(items, index, axis=0)
+        return result[0] if np.ndim(q) == 0 else result
+    
+    def rank_error(self):
+        """Écart-type de l'erreur de rang normalisée des quantiles (0 sans compaction)
+        
+        Chaque compaction du niveau h décale le rang d'une requête de ±2**h
+        ou de 0, avec un décalage tiré au hasard : les erreurs sont
+        indépendantes et d'espérance nulle, leurs variances s'additionnent.
+        """
+        return np.sqrt(self._rank_variance) / self.count if self.count else 0.0
+
+
+class EnsembleSummary:
+    """Moments et quantiles en flux d'un ensemble (scénario, année, métrique)
+    
+    Alimenté morceau par morceau (iter_scenarios) et fusionnable entre
+    processus ; to_frame donne, par année et métrique, moyenne, écart-type
+    et quantiles.
+    """
+    
+    def __init__(self, shape, quantiles=(0.05, 0.5, 0.95), k=200, seed=None):
+        self.quantiles = tuple(quantiles)
+        self.moments = MomentAccumulator(shape)
+        self.sketch = QuantileSketch(shape, k, seed)
+    
+    def update(self, values):
+        self.moments.update(values)
+        self.sketch.update(values)
+    
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+    
+    def to_frame(self, years, columns):
+        """DataFrame long (Annee, Metrique, n, mean, std, p5, p50, ...)"""
+        n_years, n_metrics = len(years), len(columns)
+        df = pd.DataFrame({
+            'Annee': np.repeat(years, n_metrics),
+            'Metrique': np.tile(columns, n_years),
+            'n': self.moments.count,
+            'mean': self.moments.mean.ravel() if self.moments.count else np.nan,
+            'std': np.sqrt(self.moments.variance).ravel(),
+        })
+        for q, values in zip(self.quantiles, self.sketch.quantile(self.quantiles)):
+            df[f'p{100 * q:g}'] = values.ravel()
+        return df
+
+
+@dataclass(frozen=True)
+class TrackedStatistic:
+    """Statistique annuelle suivie par run_until_converged
+    
+    kind vaut 'mean' (moyenne de column), 'quantile' (quantile q de column)
+    ou 'probability' (probabilité que column soit sous threshold). La
+    demi-largeur de l'intervalle de confiance doit descendre sous
+    tolerance : relative à l'estimation si relative, absolue sinon (le cas
+    naturel d'une probabilité).
+    """
+    column: str
+    kind: str = 'mean'
+    tolerance: float = 0.01
+    relative: bool = True
+    q: float = 0.95
+    threshold: float = 0.0
+    
+    @property
+    def name(self):
+        if self.kind == 'quantile':
+            return f'{self.column} P{100 * self.q:g}'
+        if self.kind == 'probability':
+            return f'P({self.column} < {self.threshold:g})'
+        return f'{self.column} moyen'
+
+
+# Statistiques suivies par défaut : revenu moyen, probabilité de déficit, P95 de l'endettement
+TRACKED_STATISTICS = (
+    TrackedStatistic('Revenus_Total', 'mean', tolerance=0.01),
+    TrackedStatistic('Solde_Financier', 'probability', tolerance=0.01, relative=False),
+    TrackedStatistic('Endettement', 'quantile', tolerance=0.01, q=0.95),
+)
+
+
+@dataclass(frozen=True)
+class PartyProfile:
+    """Configuration d'un parti pour la génération par lot de MultiPartyAnalyzer
+    
+    budget_base (millions d'euros) et adherents_base alimentent les
+    MetricSpec via base_of ; les années antérieures à creation_year sont
+    laissées à NaN. renommage_year est informatif : un parti renommé garde
+    ses flux aléatoires, indexés par parti. shocks liste les événements
+    (année, colonne, facteur), comme UMPFinanceAnalyzer.party_shocks.
+    """
+    parti: str
+    budget_base: float
+    adherents_base: float
+    creation_year: int
+    renommage_year: int = None
+    shocks: tuple = ()
+    
+    @property
+    def config(self):
+        """Valeurs de base au format de UMPFinanceAnalyzer.config"""
+        return {"budget_base": self.budget_base, "adherents_base": self.adherents_base}
+
+
 class UMPFinanceAnalyzer:
-    def __init__(self):
+    def __init__(self, seed=None, scenario_block_size=1024, metric_specs=None,
+                 start_year=2002, end_year=2025, year_block_size=16, sampling='random',
+                 antithetic=False):
+        """Initialise l'analyseur
+        
+        seed fixe l'entropie de tous les flux aléatoires (tirée au hasard si
+        None, puis conservée dans self.seed pour rejouer la génération). Le
+        bruit est tiré par tuiles de scenario_block_size scénarios sur
+        year_block_size années, chaque tuile d'une métrique ayant son propre
+        flux Philox : un même scénario donne le même résultat quel que soit le
+        découpage des calculs ou la longueur de l'horizon.
+        
+        metric_specs remplace la liste METRIC_SPECS des colonnes simulées :
+        ajouter une métrique revient à ajouter une MetricSpec.
+        
+        start_year et end_year bornent l'horizon, éventuellement très long
+        pour les tests de résistance : les cycles électoraux sont calculés
+        par règle et les événements hors horizon sont ignorés.
+        
+        sampling choisit le tirage du bruit parmi SAMPLINGS (voir _qmc_normal) ;
+        antithetic apparie les scénarios par bruits opposés (voir
+        _independent_noise).
+        """
+        if sampling not in SAMPLINGS:
+            raise ValueError(f"mode de tirage inconnu: {sampling!r} (attendu parmi {', '.join(SAMPLINGS)})")
+        if start_year > end_year:
+            raise ValueError(f"horizon vide: start_year ({start_year}) postérieur à end_year ({end_year})")
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.sampling = sampling
+        self.antithetic = antithetic
+        self.scenario_block_size = scenario_block_size
+        self.year_block_size = year_block_size
+        
         self.parti = "Union pour un Mouvement Populaire (UMP)"
         self.colors = ['#0066CC', '#FF6600', '#009900', '#990099', '#FF3366', 
                       '#33CCCC', '#FFCC00', '#666699', '#CC0066', '#339933']
         
-        self.start_year = 2002  # Création de l'UMP
-        self.end_year = 2025
+        self.start_year = start_year  # Création de l'UMP par défaut
+        self.end_year = end_year
         self.creation_year = 2002
         self.renommage_year = 2015  # Devenu Les Républicains
         
@@ -28,709 +1127,1107 @@ class UMPFinanceAnalyzer:
             "sources_financement": ["cotisations", "dons", "financement_public", "evenements", "formations"]
         }
         
-    def generate_financial_data(self):
-        """Génère des données financières pour l'UMP"""
-        print(f"🏛️ Génération des données financières pour {self.parti}...")
+        # Métriques simulées et écart-type de leur bruit multiplicatif (centré sur 1)
+        self.metric_specs = tuple(METRIC_SPECS if metric_specs is None else metric_specs)
+        self.noise_sigmas = {spec.column: spec.sigma for spec in self.metric_specs}
+        # (colonnes, facteur de Cholesky) du bruit corrélé, voir set_noise_correlation
+        self.noise_correlation = None
+        self._compiled = {}
         
-        # Créer une base de données annuelle
-        dates = pd.date_range(start=f'{self.start_year}-01-01', 
-                             end=f'{self.end_year}-12-31', freq='Y')
-        
-        data = {'Annee': [date.year for date in dates]}
-        
-        # Données d'adhérents et structure
-        data['Adherents'] = self._simulate_adherents(dates)
-        data['Federations_Departementales'] = self._simulate_federations(dates)
-        data['Elus_Locaux'] = self._simulate_elus_locaux(dates)
-        data['Elus_Nationaux'] = self._simulate_elus_nationaux(dates)
-        
-        # Revenus du parti
-        data['Revenus_Total'] = self._simulate_total_revenue(dates)
-        data['Cotisations_Adherents'] = self._simulate_membership_fees(dates)
-        data['Dons_Prives'] = self._simulate_private_donations(dates)
-        data['Financement_Public'] = self._simulate_public_funding(dates)
-        data['Revenus_Evenements'] = self._simulate_event_revenue(dates)
-        data['Revenus_Formations'] = self._simulate_training_revenue(dates)
-        data['Emprunts'] = self._simulate_loans(dates)
-        
-        # Dépenses du parti
-        data['Depenses_Total'] = self._simulate_total_expenses(dates)
-        data['Depenses_Personnel'] = self._simulate_staff_expenses(dates)
-        data['Depenses_Campagnes'] = self._simulate_campaign_expenses(dates)
-        data['Depenses_Communication'] = self._simulate_communication_expenses(dates)
-        data['Depenses_Fonctionnement'] = self._simulate_operating_expenses(dates)
-        data['Depenses_Formation'] = self._simulate_training_expenses(dates)
-        data['Remboursements_Emprunts'] = self._simulate_loan_repayments(dates)
-        
-        # Indicateurs financiers
-        data['Taux_Execution_Budget'] = self._simulate_budget_execution_rate(dates)
-        data['Ratio_Cotisations_Revenus'] = self._simulate_membership_ratio(dates)
-        data['Dependance_Financement_Public'] = self._simulate_public_funding_dependency(dates)
-        data['Solde_Financier'] = self._simulate_financial_balance(dates)
-        data['Endettement'] = self._simulate_debt(dates)
-        
-        # Investissements stratégiques
-        data['Investissement_Communication'] = self._simulate_communication_investment(dates)
-        data['Investissement_Numérique'] = self._simulate_digital_investment(dates)
-        data['Investissement_Formation'] = self._simulate_training_investment(dates)
-        data['Investissement_Recherche'] = self._simulate_research_investment(dates)
-        data['Investissement_International'] = self._simulate_international_investment(dates)
-        
-        df = pd.DataFrame(data)
+        # Chocs liés aux événements marquants : (année, colonne, facteur)
+        self.party_shocks = [
+            # Création de l'UMP (2002)
+            (2002, 'Revenus_Total', 1.8),
+            (2002, 'Adherents', 1.5),
+            # Réélection de Chirac (2002)
+            (2002, 'Dons_Prives', 2.2),
+            (2002, 'Depenses_Campagnes', 2.5),
+            # Élection de Sarkozy (2007)
+            (2007, 'Revenus_Total', 1.4),
+            (2007, 'Depenses_Campagnes', 2.8),
+            # Crise financière (2008-2009)
+            (2008, 'Dons_Prives', 0.75),
+            (2008, 'Revenus_Total', 0.90),
+            (2009, 'Dons_Prives', 0.75),
+            (2009, 'Revenus_Total', 0.90),
+            # Défaite présidentielle 2012
+            (2012, 'Financement_Public', 0.65),
+            (2012, 'Adherents', 0.88),
+            # Affaire Bygmalion (2014)
+            (2014, 'Dons_Prives', 0.60),
+            (2014, 'Revenus_Total', 0.85),
+            (2014, 'Endettement', 1.4),
+            # Changement de nom (2015)
+            (2015, 'Investissement_Communication', 1.6),
+            (2015, 'Depenses_Communication', 1.4),
+            # Primaire 2016
+            (2016, 'Revenus_Total', 1.3),
+            (2016, 'Depenses_Campagnes', 1.8),
+            # Défaite présidentielle 2017
+            (2017, 'Financement_Public', 0.45),
+            (2017, 'Adherents', 0.78),
+            (2017, 'Elus_Nationaux', 0.35),
+            # COVID-19 (2020)
+            (2020, 'Revenus_Evenements', 0.3),
+            (2020, 'Investissement_Numérique', 1.5),
+            # Élection présidentielle 2022
+            (2022, 'Depenses_Campagnes', 2.2),
+            (2022, 'Dons_Prives', 1.8),
+        ]
+        if sampling != 'random':
+            self._check_qmc_dimension()
+        
+    def generate_financial_data(self, n_scenarios=None, layout='array', first_scenario=0, freq='Y',
+                                cache=None, columns=None):
+        """Génère des données financières pour l'UMP
+        
+        Sans n_scenarios, renvoie un DataFrame d'une seule réalisation. Avec
+        n_scenarios=N, les N scénarios sont générés en une passe vectorisée :
+        layout='array' renvoie un tableau dense (scénario, année, métrique)
+        ordonné selon metric_columns, layout='long' un DataFrame avec une
+        ligne par couple (Scenario, Annee). first_scenario décale la
+        numérotation, pour générer une tranche d'un ensemble plus grand.
+        
+        freq choisit la résolution temporelle parmi FREQUENCIES ; hors 'Y', le
+        résultat assemble les morceaux de iter_financial_data (une ligne par
+        période, avec une colonne Date).
+        
+        cache (un DatasetCache) renvoie directement un jeu déjà généré avec la
+        même configuration, graine, horizon, version du code et options.
+        
+        columns restreint la génération aux colonnes demandées (rendues dans
+        l'ordre de metric_columns) et à celles dont elles dépendent : seuls
+        leurs tendances, flux de bruit et chocs sont calculés, avec des
+        valeurs identiques à celles de la génération complète.
+        """
+        self._check_output_options(layout, freq)
+        columns = self.resolve_columns(columns)
+        
+        if cache is not None:
+            key = cache.key(self._cache_material(n_scenarios=n_scenarios, layout=layout,
+                                                 first_scenario=first_scenario, freq=freq,
+                                                 columns=columns))
+            data = cache.get(key)
+            if data is None:
+                data = self.generate_financial_data(n_scenarios, layout, first_scenario, freq,
+                                                    columns=columns)
+                cache.put(key, data)
+            else:
+                print(f"♻️ Données lues depuis le cache pour {self.parti}")
+            return data
         
-        # Ajouter des tendances spécifiques à l'UMP
-        self._add_party_trends(df)
+        print(f"🏛️ Génération des données financières pour {self.parti}...")
         
+        if freq != 'Y':
+            chunks = list(self.iter_financial_data(freq, n_scenarios, layout, first_scenario,
+                                                   columns=columns))
+            if n_scenarios is not None and layout == 'array':
+                return np.concatenate([values for _, values in chunks], axis=-2)
+            return pd.concat(chunks, ignore_index=True)
+        
+        # Créer une base de données annuelle
+        years = self._years()
+        values = self._generate_values(years, n_scenarios, first_scenario, columns)
+        
+        if n_scenarios is None:
+            df = pd.DataFrame(values, columns=list(columns))
+            df.insert(0, 'Annee', years)
+        elif layout == 'long':
+            df = self._ensemble_to_frame(values, years, first_scenario, columns=columns)
+        else:
+            return values
+        
+        df.attrs['ump_state'] = self._extension_state(years, columns)
         return df
     
-    def _simulate_adherents(self, dates):
-        """Simule le nombre d'adhérents"""
-        base_adherents = self.config["adherents_base"]
-        
-        adherents = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Évolution historique des adhérents selon les périodes politiques
-            if 2002 <= year <= 2007:  # Création et présidence Chirac
-                growth_rate = 0.15
-            elif 2007 <= year <= 2012:  # Présidence Sarkozy
-                growth_rate = 0.08
-            elif 2012 <= year <= 2014:  # Après défaite 2012
-                growth_rate = -0.12
-            elif 2014 <= year <= 2016:  # Préparation primaire
-                growth_rate = 0.05
-            elif 2017 <= year <= 2022:  # Après défaite 2017
-                growth_rate = -0.18
-            else:  # Reconstruction
-                growth_rate = 0.03
-                
-            growth = 1 + growth_rate * (i/3)
-            noise = np.random.normal(1, 0.08)
-            adherents.append(base_adherents * growth * noise)
-        
-        return adherents
-    
-    def _simulate_federations(self, dates):
-        """Simule le nombre de fédérations départementales"""
-        base_federations = 100  # Métropole + outre-mer
-        
-        federations = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2007:
-                growth_rate = 0.02
-            elif year <= 2012:
-                growth_rate = 0.01
-            else:
-                growth_rate = -0.005
-                
-            growth = 1 + growth_rate * (i/4)
-            federations.append(base_federations * growth)
-        
-        return federations
+    def extend(self, df, to_year):
+        """Prolonge jusqu'à to_year un DataFrame annuel de generate_financial_data
+        
+        Seules les années nouvelles sont générées, puis ajoutées à la fin : les
+        lignes existantes restent identiques octet pour octet, et le résultat
+        est celui qu'aurait donné une génération directe jusqu'à to_year. Le
+        niveau des trajectoires composées (Endettement) est repris de l'état
+        stocké dans df.attrs['ump_state'], ou recalculé s'il manque (données
+        relues d'un fichier) ; les régimes de croissance et les cycles sont
+        des règles sur l'année, et les flux de bruit sont positionnés
+        directement sur les tuiles des nouvelles années.
+        
+        En layout long, les nouvelles lignes (scénario par scénario) suivent
+        le bloc existant ; elles prennent les types des colonnes de df.
+        L'horizon de l'analyseur est porté à to_year. Seules les données
+        annuelles (sans colonne Date) et le tirage 'random' se prolongent :
+        en quasi-Monte Carlo, chaque scénario est un point dont la dimension
+        dépend de l'horizon.
+        """
+        if 'Date' in df:
+            raise ValueError("extend ne prolonge que des données annuelles : régénérer les données "
+                             "infra-annuelles (colonne Date) avec generate_financial_data(freq=...)")
+        last_year = int(df['Annee'].max())
+        if to_year <= last_year:
+            return df
+        if self.sampling != 'random':
+            raise ValueError(f"extend n'est pas pris en charge avec le tirage {self.sampling!r} "
+                             "(la dimension des points dépend de l'horizon) : régénérer l'horizon complet")
+        if int(df['Annee'].min()) != self.start_year:
+            raise ValueError(f"le DataFrame doit commencer en {self.start_year} pour être prolongé")
+        
+        columns = self.resolve_columns([column for column in df.columns if column in self.metric_columns])
+        state = df.attrs.get('ump_state')
+        if not state or state['year'] != last_year or not set(state['compound_level']) <= set(columns):
+            state = self._extension_state(np.arange(self.start_year, last_year + 1), columns)
+        compiled = self._compiled_metrics(columns)
+        level = [state['compound_level'][compiled.columns[j]] for j in compiled.compound]
+        
+        years = np.arange(last_year + 1, to_year + 1)
+        if 'Scenario' in df:
+            scenarios = np.unique(df['Scenario'].to_numpy())
+            first_scenario, n_scenarios = int(scenarios[0]), len(scenarios)
+            if scenarios[-1] - first_scenario + 1 != n_scenarios:
+                raise ValueError("les scénarios du DataFrame doivent être consécutifs")
+            values = self._generate_values(years, n_scenarios, first_scenario, columns, level)
+            new_rows = self._ensemble_to_frame(values, years, first_scenario, columns=columns)
+        else:
+            values = self._generate_values(years, None, 0, columns, level)
+            new_rows = pd.DataFrame(values, columns=list(columns))
+            new_rows.insert(0, 'Annee', years)
+        
+        self.end_year = max(self.end_year, to_year)
+        # Les nouvelles lignes prennent les types de df (relu avec load_financial_data, par exemple)
+        extended = pd.concat([df, new_rows[df.columns].astype(df.dtypes)], ignore_index=True)
+        extended.attrs['ump_state'] = self._extension_state(years, columns, level)
+        return extended
     
-    def _simulate_elus_locaux(self, dates):
-        """Simule le nombre d'élus locaux"""
-        base_elus = 50000  # Maires, conseillers municipaux, etc.
-        
-        elus = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Élections municipales tous les 6 ans
-            if year in [2001, 2008, 2014, 2020]:
-                multiplier = 1.15
-            else:
-                multiplier = 1.0
-                
-            # Tendance générale
-            if year <= 2007:
-                growth_rate = 0.03
-            elif year <= 2014:
-                growth_rate = -0.01
-            else:
-                growth_rate = -0.02
-                
-            growth = 1 + growth_rate * (i/5)
-            noise = np.random.normal(1, 0.06)
-            elus.append(base_elus * growth * multiplier * noise)
-        
-        return elus
+    def _extension_state(self, years, columns, level=None):
+        """État nécessaire à extend : dernière année et niveau des trajectoires composées"""
+        compiled = self._compiled_metrics(columns)
+        if not compiled.compound.size:
+            return {'year': int(years[-1]), 'compound_level': {}}
+        trend = compiled.trend(years, self.config, origin=self.start_year, level=level)
+        return {'year': int(years[-1]),
+                'compound_level': {compiled.columns[j]: float(trend[-1, j]) for j in compiled.compound}}
     
-    def _simulate_elus_nationaux(self, dates):
-        """Simule le nombre d'élus nationaux"""
-        base_elus = 300  # Députés, sénateurs, etc.
-        
-        elus = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Élections législatives tous les 5 ans
-            if year in [2002, 2007, 2012, 2017, 2022]:
-                if year in [2002, 2007]:  # Majorité UMP
-                    multiplier = 1.4
-                elif year in [2012]:  # Opposition
-                    multiplier = 0.7
-                elif year in [2017]:  # LREM majoritaire
-                    multiplier = 0.4
-                else:  # 2022
-                    multiplier = 0.6
+    def iter_financial_data(self, freq='M', n_scenarios=None, layout='array', first_scenario=0,
+                            chunk_periods=512, columns=None):
+        """Génère les données à la fréquence freq, par morceaux de chunk_periods périodes
+        
+        Les flux annuels (MetricSpec.flow) sont répartis jour par jour selon
+        leur profil saisonnier puis sommés sur chaque période ; les stocks et
+        ratios prennent le niveau de l'année où se termine la période. Seuls
+        les tableaux annuels et le morceau courant sont en mémoire.
+        
+        Chaque morceau est un DataFrame (colonnes Date et Annee en tête) pour
+        une réalisation unique ou en layout='long', et un couple (dates,
+        tableau (scénario, période, métrique)) en layout='array'. Les dates
+        restent limitées à la plage des Timestamp pandas (1677-2262).
+        columns restreint les colonnes générées, comme pour generate_financial_data.
+        """
+        self._check_output_options(layout, freq)
+        columns = self.resolve_columns(columns)
+        
+        years = self._years()
+        annual = self._generate_values(years, n_scenarios, first_scenario, columns)
+        periods = pd.period_range(start=f'{self.start_year}-01-01', end=f'{self.end_year}-12-31', freq=freq)
+        
+        for start in range(0, len(periods), chunk_periods):
+            chunk = periods[start:start + chunk_periods]
+            dates = chunk.start_time
+            if freq == 'Y':
+                period_years = chunk.year.to_numpy()
+                values = annual[..., period_years - self.start_year, :]
             else:
-                multiplier = 1.0
-                
-            growth = 1 - 0.02 * (i/2)  # Tendance décroissante générale
-            noise = np.random.normal(1, 0.12)
-            elus.append(base_elus * growth * multiplier * noise)
-        
-        return elus
-    
-    def _simulate_total_revenue(self, dates):
-        """Simule les revenus totaux"""
-        base_revenue = self.config["budget_base"]
-        
-        revenue = []
-        for i, date in enumerate(dates):
-            year = date.year
+                period_years, values = self._disaggregate(annual, chunk, columns)
             
-            # Croissance historique des revenus
-            if 2002 <= year <= 2007:  # Période faste
-                growth_rate = 0.12
-            elif 2008 <= year <= 2012:  # Crise financière + fin Sarkozy
-                growth_rate = 0.04
-            elif 2013 <= year <= 2016:  # Préparation primaire
-                growth_rate = 0.08
-            elif 2017 <= year <= 2021:  # Après défaite
-                growth_rate = -0.10
-            else:  # Reconstruction
-                growth_rate = 0.05
-                
-            growth = 1 + growth_rate * (i/3)
-            noise = np.random.normal(1, 0.10)
-            revenue.append(base_revenue * growth * noise)
-        
-        return revenue
-    
-    def _simulate_membership_fees(self, dates):
-        """Simule les cotisations des adhérents"""
-        base_fees = self.config["budget_base"] * 0.25
-        
-        fees = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Évolution du nombre d'adhérents et du montant des cotisations
-            if year <= 2007:
-                growth_rate = 0.10
-            elif year <= 2012:
-                growth_rate = 0.03
-            elif year <= 2016:
-                growth_rate = 0.06
+            if n_scenarios is None:
+                df = pd.DataFrame(values, columns=list(columns))
+                df.insert(0, 'Annee', period_years)
+                df.insert(0, 'Date', dates)
+                yield df
+            elif layout == 'long':
+                yield self._ensemble_to_frame(values, period_years, first_scenario, dates, columns)
             else:
-                growth_rate = -0.05
-                
-            growth = 1 + growth_rate * (i/4)
-            noise = np.random.normal(1, 0.08)
-            fees.append(base_fees * growth * noise)
-        
-        return fees
+                yield dates, values
     
-    def _simulate_private_donations(self, dates):
-        """Simule les dons privés"""
-        base_donations = self.config["budget_base"] * 0.35
-        
-        donations = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Plafonnement des dons et évolution législative
-            if year <= 2007:  # Avant plafonnement strict
-                multiplier = 1.2
-            elif year <= 2012:  # Réglementation renforcée
-                multiplier = 0.8
-            elif year <= 2017:  # Adaptation
-                multiplier = 0.9
-            else:  # Nouveaux modes de collecte
-                multiplier = 1.1
-                
-            # Cycles électoraux
-            if year in [2002, 2007, 2012, 2017, 2022]:
-                electoral_multiplier = 1.8
-            else:
-                electoral_multiplier = 1.0
-                
-            growth = 1 + 0.05 * (i/3)
-            noise = np.random.normal(1, 0.15)
-            donations.append(base_donations * growth * multiplier * electoral_multiplier * noise)
-        
-        return donations
+    def party_profile(self):
+        """PartyProfile de ce parti, pour l'inclure dans un MultiPartyAnalyzer"""
+        return PartyProfile(self.parti, self.config['budget_base'], self.config['adherents_base'],
+                            self.creation_year, self.renommage_year, tuple(self.party_shocks))
     
-    def _simulate_public_funding(self, dates):
-        """Simule le financement public"""
-        base_funding = self.config["budget_base"] * 0.30
-        
-        funding = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Dépend des résultats électoraux
-            if year in [2003, 2004, 2005, 2006, 2007, 2008]:  # Majorité présidentielle
-                multiplier = 1.4
-            elif year in [2012, 2013, 2014, 2015, 2016]:  # Opposition
-                multiplier = 0.7
-            elif year in [2017, 2018, 2019, 2020, 2021]:  # Faible représentation
-                multiplier = 0.4
-            else:  # 2022-2025
-                multiplier = 0.6
-                
-            growth = 1 + 0.02 * (i/4)
-            noise = np.random.normal(1, 0.08)
-            funding.append(base_funding * growth * multiplier * noise)
-        
-        return funding
-    
-    def _simulate_event_revenue(self, dates):
-        """Simule les revenus des événements"""
-        base_revenue = self.config["budget_base"] * 0.05
-        
-        revenue = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Universités d'été, congrès, etc.
-            if year in [2002, 2004, 2006, 2010, 2014, 2016, 2021]:
-                multiplier = 1.6  # Années de congrès ou universités d'été importantes
-            else:
-                multiplier = 1.0
-                
-            growth = 1 + 0.03 * (i/3)
-            noise = np.random.normal(1, 0.12)
-            revenue.append(base_revenue * growth * multiplier * noise)
-        
-        return revenue
+    def export_schema(self, metric_dtype='float64'):
+        """Types des colonnes des exports : clés entières, Date, métriques en metric_dtype"""
+        if np.dtype(metric_dtype) not in (np.float32, np.float64):
+            raise ValueError(f"type de métrique non pris en charge: {metric_dtype!r} (float32 ou float64)")
+        return {'Scenario': 'int32', 'Date': 'datetime64[ns]', 'Annee': 'int16',
+                **{column: metric_dtype for column in self.metric_columns}}
     
-    def _simulate_training_revenue(self, dates):
-        """Simule les revenus des formations"""
-        base_revenue = self.config["budget_base"] * 0.03
-        
-        revenue = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2010:  # Développement des formations
-                growth = 1 + 0.06 * max(0, (year - 2010)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.10)
-            revenue.append(base_revenue * growth * noise)
-        
-        return revenue
+    def load_financial_data(self, path, columns=None, scenarios=None, metric_dtype='float64', format=None):
+        """Relit un export précédent avec un schéma de types explicite
+        
+        path est un fichier de l'un des formats de DATASET_WRITERS (CSV
+        éventuellement compressé en .gz ou .zst) ou un ensemble .npy de
+        write_ensemble_store. Les colonnes sont validées avant lecture : la
+        colonne Annee est obligatoire, toute autre colonne doit être une clé
+        (Scenario, Date) ou une métrique de metric_columns, et les colonnes
+        demandées doivent être présentes. Les types suivent export_schema :
+        aucune inférence n'est faite au chargement.
+        
+        Un export d'un seul scénario se passe directement à
+        create_financial_analysis, sans régénérer les données ; d'un ensemble
+        long (colonne Scenario), choisir un scénario avec scenarios=[s] et
+        retirer la colonne Scenario.
+        """
+        schema = self.export_schema(metric_dtype)
+        if path.endswith('.npy'):
+            available = ['Scenario', 'Annee', *open_ensemble_store(path)[1]['columns']]
+        else:
+            available = dataset_columns(path, format)
+        
+        if 'Annee' not in available:
+            raise ValueError(f"{path}: colonne Annee absente")
+        unknown = [column for column in available if column not in schema]
+        if unknown:
+            raise ValueError(f"{path}: colonnes inconnues: {', '.join(unknown)}")
+        if columns is None:
+            columns = [column for column in self.metric_columns if column in available]
+        else:
+            columns = self.resolve_columns(columns)
+            missing = [column for column in columns if column not in available]
+            if missing:
+                raise ValueError(f"{path}: colonnes absentes: {', '.join(missing)}")
+        if scenarios is not None and 'Scenario' not in available:
+            raise ValueError(f"{path}: pas de colonne Scenario pour filtrer les scénarios")
+        
+        selected = [column for column in ('Scenario', 'Date', 'Annee') if column in available] + list(columns)
+        dtype = {column: schema[column] for column in selected}
+        if path.endswith('.npy'):
+            return self._load_ensemble_store(path, columns, scenarios).astype(dtype)
+        return read_dataset(path, selected, scenarios, format, dtype)
     
-    def _simulate_loans(self, dates):
-        """Simule les emprunts"""
-        base_loans = self.config["budget_base"] * 0.02
-        
-        loans = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            # Besoins de financement particuliers
-            if year in [2002, 2007, 2012, 2017, 2022]:  # Années électorales
-                multiplier = 2.5
-            elif year in [2003, 2008, 2013, 2018]:  # Après élections
-                multiplier = 1.5
-            else:
-                multiplier = 1.0
-                
-            growth = 1 + 0.01 * (i/4)
-            noise = np.random.normal(1, 0.20)
-            loans.append(base_loans * growth * multiplier * noise)
-        
-        return loans
+    def _load_ensemble_store(self, path, columns, scenarios=None):
+        """DataFrame long des scénarios et colonnes voulus d'un ensemble .npy"""
+        values, metadata = open_ensemble_store(path)
+        index = [metadata['columns'].index(column) for column in columns]
+        if scenarios is None:
+            scenario_ids = np.arange(len(values))
+        else:
+            scenario_ids = np.unique(np.asarray(list(scenarios)))
+            scenario_ids = scenario_ids[(scenario_ids >= 0) & (scenario_ids < len(values))]
+        selected = values[scenario_ids][..., index]
+        n_scenarios, n_years = selected.shape[:2]
+        df = pd.DataFrame(selected.reshape(n_scenarios * n_years, len(columns)), columns=list(columns))
+        df.insert(0, 'Annee', np.tile(metadata['years'], n_scenarios))
+        df.insert(0, 'Scenario', np.repeat(scenario_ids, n_years))
+        return df
     
-    def _simulate_total_expenses(self, dates):
-        """Simule les dépenses totales"""
-        base_expenses = self.config["budget_base"] * 0.95
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year in [2002, 2007, 2012, 2017, 2022]:  # Années électorales
-                multiplier = 1.4
-            else:
-                multiplier = 1.0
-                
-            growth = 1 + 0.04 * (i/3)
-            noise = np.random.normal(1, 0.08)
-            expenses.append(base_expenses * growth * multiplier * noise)
-        
-        return expenses
+    def _cache_material(self, **options):
+        """Paramètres qui déterminent entièrement un jeu de données généré"""
+        return {
+            'code_version': CODE_VERSION,
+            'parti': self.parti,
+            'config': self.config,
+            'seed': self.seed,
+            'horizon': [self.start_year, self.end_year],
+            'blocks': [self.scenario_block_size, self.year_block_size],
+            'sampling': self.sampling,
+            'antithetic': self.antithetic,
+            'metric_specs': repr(self.metric_specs),
+            'noise_sigmas': self.noise_sigmas,
+            'noise_correlation': None if self.noise_correlation is None else
+                [self.noise_correlation[0], self.noise_correlation[1].tolist()],
+            'party_shocks': self.party_shocks,
+            'options': options,
+        }
     
-    def _simulate_staff_expenses(self, dates):
-        """Simule les dépenses de personnel"""
-        base_staff = self.config["budget_base"] * 0.35
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2012:  # Structure importante
-                growth_rate = 0.05
-            else:  # Rationalisation
-                growth_rate = -0.02
-                
-            growth = 1 + growth_rate * (i/4)
-            noise = np.random.normal(1, 0.06)
-            expenses.append(base_staff * growth * noise)
-        
-        return expenses
-    
-    def _simulate_campaign_expenses(self, dates):
-        """Simule les dépenses de campagne"""
-        base_campaign = self.config["budget_base"] * 0.25
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year in [2002, 2007, 2012, 2017, 2022]:  # Années électorales
-                multiplier = 3.0
-            elif year in [2001, 2006, 2011, 2016, 2021]:  # Années pré-électorales
-                multiplier = 1.8
-            else:
-                multiplier = 0.5
-                
-            growth = 1 + 0.03 * (i/3)
-            noise = np.random.normal(1, 0.25)
-            expenses.append(base_campaign * growth * multiplier * noise)
-        
-        return expenses
+    def _check_output_options(self, layout, freq):
+        """Valide les options de sortie de la génération"""
+        if layout not in ('array', 'long'):
+            raise ValueError(f"layout inconnu: {layout!r} (attendu 'array' ou 'long')")
+        if freq not in FREQUENCIES:
+            raise ValueError(f"fréquence inconnue: {freq!r} (attendu parmi {', '.join(FREQUENCIES)})")
     
-    def _simulate_communication_expenses(self, dates):
-        """Simule les dépenses de communication"""
-        base_communication = self.config["budget_base"] * 0.15
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2010:  # Importance croissante de la communication
-                growth = 1 + 0.07 * max(0, (year - 2010)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.12)
-            expenses.append(base_communication * growth * noise)
-        
-        return expenses
+    def _disaggregate(self, annual, periods, columns=None):
+        """Passe des valeurs annuelles (..., années, métriques) aux périodes données
+        
+        Renvoie l'année de fin de chaque période et le tableau (..., périodes,
+        métriques). Une période à cheval sur deux années (semaine du nouvel
+        an) reçoit la part de flux de chacune.
+        """
+        first_day = np.datetime64(f'{self.start_year}-01-01')
+        last_day = np.datetime64(f'{self.end_year}-12-31')
+        starts = np.maximum(periods.start_time.to_numpy().astype('datetime64[D]'), first_day)
+        ends = np.minimum(periods.end_time.to_numpy().astype('datetime64[D]'), last_day)
+        start_years = starts.astype('datetime64[Y]').astype(int) + 1970
+        end_years = ends.astype('datetime64[Y]').astype(int) + 1970
+        
+        # Part de l'année écoulée au début et à la fin de chaque période, par profil
+        elapsed_before = self._year_fraction(starts, inclusive=False)
+        elapsed_after = self._year_fraction(ends, inclusive=True)
+        same_year = start_years == end_years
+        share_first = np.where(same_year, elapsed_after - elapsed_before, 1 - elapsed_before)
+        share_last = np.where(same_year, 0.0, elapsed_after)
+        
+        compiled = self._compiled_metrics(columns)
+        share_first = share_first[compiled.profile_index].T
+        share_last = share_last[compiled.profile_index].T
+        
+        first = annual[..., start_years - self.start_year, :]
+        last = annual[..., end_years - self.start_year, :]
+        values = np.where(compiled.flow, first * share_first + last * share_last, last)
+        return end_years, values
     
-    def _simulate_operating_expenses(self, dates):
-        """Simule les dépenses de fonctionnement"""
-        base_operating = self.config["budget_base"] * 0.12
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            growth = 1 + 0.02 * (i/4)
-            noise = np.random.normal(1, 0.05)
-            expenses.append(base_operating * growth * noise)
-        
-        return expenses
+    def _year_fraction(self, days, inclusive):
+        """Fraction de l'année écoulée avant (ou jusqu'à la fin de) chaque jour, par profil
+        
+        Renvoie un tableau (profils, jours) : le profil 0 est uniforme, les
+        suivants sont ceux de SEASONAL_PROFILES, appliqués les années
+        électorales.
+        """
+        year = days.astype('datetime64[Y]')
+        month = days.astype('datetime64[M]')
+        day_of_year = (days - year.astype('datetime64[D]')).astype(int) + inclusive
+        days_in_year = ((year + 1).astype('datetime64[D]') - year.astype('datetime64[D]')).astype(int)
+        day_of_month = (days - month.astype('datetime64[D]')).astype(int) + inclusive
+        days_in_month = ((month + 1).astype('datetime64[D]') - month.astype('datetime64[D]')).astype(int)
+        month_index = month.astype(int) % 12
+        election = PRESIDENTIAL_CYCLE.mask(year.astype(int) + 1970)
+        
+        uniform = day_of_year / days_in_year
+        fractions = [uniform]
+        for profile in SEASONAL_PROFILES.values():
+            before = np.concatenate([[0.0], np.cumsum(profile)[:-1]])
+            seasonal = before[month_index] + day_of_month / days_in_month * profile[month_index]
+            fractions.append(np.where(election, seasonal, uniform))
+        return np.stack(fractions)
     
-    def _simulate_training_expenses(self, dates):
-        """Simule les dépenses de formation"""
-        base_training = self.config["budget_base"] * 0.05
-        
-        expenses = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2008:  # Développement de l'offre de formation
-                growth = 1 + 0.05 * max(0, (year - 2008)/10)
+    def iter_scenarios(self, n_scenarios, chunk_size=None, layout='array', columns=None,
+                       n_workers=None, max_pending=None):
+        """Génère n_scenarios scénarios par morceaux de chunk_size, à la demande
+        
+        Chaque morceau est un couple (first_scenario, tableau (scénario, année,
+        métrique)) en layout='array', ou un DataFrame long en layout='long' ;
+        ses valeurs sont celles de la même tranche de
+        generate_financial_data(n_scenarios). chunk_size vaut par défaut
+        scenario_block_size.
+        
+        Le générateur ne calcule un morceau que lorsque le consommateur le
+        demande : la mémoire reste bornée par quelques morceaux, quel que
+        soit n_scenarios. Avec n_workers, les morceaux sont calculés en
+        parallèle, au plus max_pending (par défaut 2 * n_workers) en avance
+        sur le consommateur.
+        """
+        self._check_output_options(layout, 'Y')
+        columns = self.resolve_columns(columns)
+        chunk_size = chunk_size or self.scenario_block_size
+        years = self._years()
+        slices = [(first, min(chunk_size, n_scenarios - first)) for first in range(0, n_scenarios, chunk_size)]
+        self._check_slicing(len(slices))
+        
+        def chunks():
+            if not n_workers:
+                for first, count in slices:
+                    yield first, self._generate_values(years, count, first, columns)
+                return
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                todo = deque(slices)
+                pending = deque()
+                while todo or pending:
+                    # Un nouveau morceau n'est soumis que si le consommateur a libéré une place
+                    while todo and len(pending) < (max_pending or 2 * n_workers):
+                        first, count = todo.popleft()
+                        pending.append((first, pool.submit(_chunk_worker, self, first, count, columns)))
+                    first, future = pending.popleft()
+                    yield first, future.result()
+        
+        for first, values in chunks():
+            if layout == 'long':
+                yield self._ensemble_to_frame(values, years, first, columns=columns)
             else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.10)
-            expenses.append(base_training * growth * noise)
-        
-        return expenses
+                yield first, values
     
-    def _simulate_loan_repayments(self, dates):
-        """Simule les remboursements d'emprunts"""
-        base_repayment = self.config["budget_base"] * 0.03
-        
-        repayments = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2010:  # Accumulation de la dette
-                growth = 1 + 0.08 * max(0, (year - 2010)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.15)
-            repayments.append(base_repayment * growth * noise)
-        
-        return repayments
-    
-    def _simulate_budget_execution_rate(self, dates):
-        """Simule le taux d'exécution du budget"""
-        rates = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2005:
-                base_rate = 0.85
-            elif year <= 2012:
-                base_rate = 0.88
-            elif year <= 2017:
-                base_rate = 0.82  # Difficultés financières
-            else:
-                base_rate = 0.87
-                
-            noise = np.random.normal(1, 0.04)
-            rates.append(base_rate * noise)
-        
-        return rates
-    
-    def _simulate_membership_ratio(self, dates):
-        """Simule le ratio cotisations/revenus"""
-        ratios = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2007:
-                base_ratio = 0.28
-            elif year <= 2012:
-                base_ratio = 0.25
-            elif year <= 2017:
-                base_ratio = 0.22
-            else:
-                base_ratio = 0.18  # Baisse de la part des cotisations
-                
-            noise = np.random.normal(1, 0.05)
-            ratios.append(base_ratio * noise)
-        
-        return ratios
-    
-    def _simulate_public_funding_dependency(self, dates):
-        """Simule la dépendance au financement public"""
-        dependencies = []
-        for i, date in enumerate(dates):
-            year = date.year
+    def summarize_ensemble(self, n_scenarios, quantiles=(0.05, 0.5, 0.95), columns=None,
+                           chunk_size=None, n_workers=None, k=200):
+        """Moyenne, écart-type et quantiles par (année, métrique) sans garder l'ensemble
+        
+        Les morceaux de iter_scenarios alimentent un EnsembleSummary (Welford
+        et sketch de quantiles de paramètre k) ; avec n_workers, chaque
+        processus résume une tranche de scénarios et les résumés sont
+        fusionnés. La mémoire reste bornée par un morceau et les sketches.
+        Renvoie le DataFrame de EnsembleSummary.to_frame.
+        """
+        columns = self.resolve_columns(columns)
+        years = self._years()
+        shape = (len(years), len(columns))
+        
+        if not n_workers:
+            summary = EnsembleSummary(shape, quantiles, k, seed=[*self._entropy(), 0])
+            for _, values in self.iter_scenarios(n_scenarios, chunk_size, columns=columns):
+                summary.update(values)
+            return summary.to_frame(years, columns)
+        
+        slices = self._scenario_slices(n_scenarios, n_workers * 4)
+        self._check_slicing(len(slices))
+        if not slices:
+            return EnsembleSummary(shape, quantiles, k, seed=[*self._entropy(), 0]).to_frame(years, columns)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_summary_worker, self, first, count, columns, chunk_size,
+                                   EnsembleSummary(shape, quantiles, k, seed=[*self._entropy(), first]))
+                       for first, count in slices]
+            summary = futures[0].result()
+            for future in futures[1:]:
+                summary.merge(future.result())
+        return summary.to_frame(years, columns)
+    
+    def run_until_converged(self, statistics=TRACKED_STATISTICS, confidence=0.95, batch_size=None,
+                            min_scenarios=256, max_scenarios=1_000_000, k=400):
+        """Génère des lots de scénarios jusqu'à convergence des statistiques suivies
+        
+        statistics est une suite de TrackedStatistic, suivies pour chaque
+        année (par défaut TRACKED_STATISTICS : revenu moyen, probabilité de
+        déficit et P95 de l'Endettement). Après chaque lot de batch_size
+        scénarios (par défaut scenario_block_size), la demi-largeur de
+        l'intervalle de confiance de chaque statistique est comparée à sa
+        tolérance. L'intervalle d'un quantile est pris sur les rangs, sans
+        hypothèse de loi, et élargi de l'erreur de rang du QuantileSketch où
+        il est lu. Le calcul s'arrête dès que toutes les années ont
+        convergé, ou à max_scenarios.
+        
+        Les intervalles supposent des scénarios indépendants : ils sont
+        prudents (trop larges) en mode antithétique ou quasi-Monte Carlo.
+        Renvoie un DataFrame par (statistique, année) avec l'estimation, la
+        demi-largeur, la convergence et le nombre de scénarios utilisés.
+        """
+        self._check_slicing(2)
+        statistics = tuple(statistics)
+        unknown = {statistic.kind for statistic in statistics} - {'mean', 'quantile', 'probability'}
+        if unknown:
+            raise ValueError(f"statistique inconnue: {', '.join(sorted(unknown))} "
+                             "(attendu 'mean', 'quantile' ou 'probability')")
+        columns = self.resolve_columns([statistic.column for statistic in statistics])
+        years = self._years()
+        z = norm.ppf(0.5 + confidence / 2)
+        
+        trackers = [QuantileSketch(len(years), k, seed=[*self._entropy(), 1, i])
+                    if statistic.kind == 'quantile' else MomentAccumulator(len(years))
+                    for i, statistic in enumerate(statistics)]
+        
+        def measure(n_scenarios):
+            """(estimation, demi-largeur) par année de chaque statistique"""
+            report = {}
+            for statistic, tracker in zip(statistics, trackers):
+                if statistic.kind == 'quantile':
+                    q = statistic.q
+                    spread = z * np.sqrt(q * (1 - q) / max(n_scenarios, 1) + tracker.rank_error()**2)
+                    low, estimate, high = tracker.quantile([max(0.0, q - spread), q, min(1.0, q + spread)])
+                    half_width = (high - low) / 2
+                else:
+                    estimate = tracker.mean if tracker.count else np.full(len(years), np.nan)
+                    half_width = z * np.sqrt(np.maximum(tracker.variance, 0) / max(n_scenarios, 1))
+                report[statistic.name] = (estimate, half_width)
+            return report
+        
+        def converged(report):
+            return {statistic.name: report[statistic.name][1] <= statistic.tolerance * (
+                        np.abs(report[statistic.name][0]) if statistic.relative else 1.0)
+                    for statistic in statistics}
+        
+        batch_size = batch_size or self.scenario_block_size
+        n_scenarios = 0
+        report = measure(n_scenarios)
+        while n_scenarios < max_scenarios:
+            count = min(batch_size, max_scenarios - n_scenarios)
+            values = self._generate_values(years, count, n_scenarios, columns)
+            n_scenarios += count
+            for statistic, tracker in zip(statistics, trackers):
+                paths = values[..., columns.index(statistic.column)]
+                tracker.update(paths < statistic.threshold if statistic.kind == 'probability' else paths)
+            report = measure(n_scenarios)
+            if n_scenarios >= min_scenarios and all(flags.all() for flags in converged(report).values()):
+                break
+        
+        flags = converged(report)
+        print(f"🎯 {n_scenarios:,} scénarios générés "
+              f"({'convergence atteinte' if all(f.all() for f in flags.values()) else 'maximum atteint'})")
+        return pd.DataFrame([
+            {'statistic': name, 'Annee': year, 'estimate': estimate[i], 'half_width': half_width[i],
+             'converged': flags[name][i], 'n_scenarios': n_scenarios}
+            for name, (estimate, half_width) in report.items()
+            for i, year in enumerate(years)])
+    
+    def _entropy(self):
+        """Entropie de self.seed sous forme de liste, pour dériver des graines annexes"""
+        return list(self.seed) if isinstance(self.seed, (list, tuple)) else [self.seed]
+    
+    def ensemble_statistics(self, n_scenarios, control_variate=True, chunk_size=None):
+        """Estime des statistiques du solde financier et de l'endettement d'un ensemble
+        
+        Le solde moyen et l'endettement final moyen sont linéaires dans le
+        bruit, dont l'espérance est nulle : leur espérance est exactement celle
+        du chemin déterministe (tendance et chocs, sans bruit), rapportée
+        directement (méthode 'analytique', erreur type nulle) à côté de la
+        moyenne brute de l'ensemble.
+        
+        Les probabilités de déficit cumulé et de dépassement de l'endettement
+        déterministe en fin de période ne sont pas linéaires. Avec
+        control_variate, leur moyenne est corrigée par l'écart linéaire
+        correspondant au chemin déterministe (solde cumulé, endettement final),
+        d'espérance nulle ; le coefficient est estimé par régression sur
+        l'ensemble.
+        
+        Les scénarios sont générés par morceaux de chunk_size, sans garder
+        l'ensemble en mémoire. En mode antithétique, chaque paire de
+        scénarios compte pour une observation (n_scenarios doit être pair).
+        
+        Renvoie un DataFrame avec, par statistique, la méthode, l'estimation,
+        son erreur type, celles de la moyenne brute et le facteur de réduction
+        de variance (NaN lorsque l'erreur corrigée est au niveau des arrondis).
+        """
+        if self.antithetic and n_scenarios % 2:
+            raise ValueError("le mode antithétique demande un nombre pair de scénarios")
+        
+        columns = self.resolve_columns(['Solde_Financier', 'Endettement'])
+        years = self._years()
+        balance, debt = columns.index('Solde_Financier'), columns.index('Endettement')
+        deterministic = (self._compiled_metrics(columns).trend(years, self.config, origin=self.start_year)
+                         * self._shock_factors(years, columns))
+        final_debt = deterministic[-1, debt]
+        tolerance = 1e3 * np.finfo(float).eps
+        # statistique : (colonne, statistique par scénario, contrôle linéaire ou None si analytique)
+        statistics = {
+            'Solde_Financier moyen': (balance, lambda paths: paths.mean(axis=-1), None),
+            'Endettement final': (debt, lambda paths: paths[:, -1], None),
+            'P(déficit cumulé)': (balance, lambda paths: (paths.sum(axis=-1) < 0).astype(float),
+                                  lambda paths: paths.sum(axis=-1)),
+            'P(Endettement final > tendance)': (debt, lambda paths: (paths[:, -1] > final_debt).astype(float),
+                                                lambda paths: paths[:, -1]),
+        }
+        samples = {name: [] for name in statistics}
+        controls = {name: [] for name in statistics}
+        
+        chunk_size = chunk_size or self.scenario_block_size
+        chunk_size += chunk_size % 2
+        self._check_slicing(-(-n_scenarios // chunk_size))
+        for first in range(0, n_scenarios, chunk_size):
+            count = min(chunk_size, n_scenarios - first)
+            values = self._generate_values(years, count, first, columns)
+            for name, (j, statistic, control) in statistics.items():
+                samples[name].append(statistic(values[..., j]))
+                if control is not None:
+                    controls[name].append(control(values[..., j]))
+        
+        rows = []
+        for name, (j, statistic, control) in statistics.items():
+            sample = np.concatenate(samples[name])
+            if self.antithetic:
+                sample = sample.reshape(-1, 2).mean(axis=1)
+            naive_error = sample.std(ddof=1) / np.sqrt(len(sample))
+            if control is None:
+                rows.append({'statistic': name, 'method': 'analytique',
+                             'estimate': statistic(deterministic[None, :, j])[0], 'std_error': 0.0,
+                             'naive_estimate': sample.mean(), 'naive_std_error': naive_error,
+                             'variance_reduction': np.nan})
+                continue
             
-            if year <= 2007:
-                base_dependency = 0.25  # Moins dépendant (dons importants)
-            elif year <= 2012:
-                base_dependency = 0.32
-            elif year <= 2017:
-                base_dependency = 0.45  # Plus dépendant
+            method, adjusted = 'moyenne', sample
+            reference = control(deterministic[None, :, j])[0]
+            deviation = np.concatenate(controls[name]) - reference
+            if self.antithetic:
+                deviation = deviation.reshape(-1, 2).mean(axis=1)
+            # en mode antithétique, l'écart linéaire d'une paire est nul aux arrondis près
+            scale = control(np.abs(deterministic[None, :, j]))[0]
+            if control_variate and deviation.std() > tolerance * scale:
+                beta = np.cov(sample, deviation)[0, 1] / deviation.var(ddof=1)
+                method, adjusted = 'variable de contrôle', sample - beta * deviation
+            error = adjusted.std(ddof=1) / np.sqrt(len(adjusted))
+            rows.append({'statistic': name, 'method': method, 'estimate': adjusted.mean(), 'std_error': error,
+                         'naive_estimate': sample.mean(), 'naive_std_error': naive_error,
+                         'variance_reduction': ((naive_error / error) ** 2
+                                                if error > tolerance * max(naive_error, abs(sample.mean()))
+                                                else np.nan)})
+        return pd.DataFrame(rows)
+    
+    def export_csv(self, path, n_scenarios, columns=None, chunk_size=None, precision=None, compression=None,
+                   buffer_size=1 << 20):
+        """Exporte un ensemble en CSV long (Scenario, Annee, colonnes) morceau par morceau
+        
+        Les morceaux de iter_scenarios passent directement au CsvChunkWriter :
+        ni l'ensemble ni le DataFrame complet n'existent en mémoire.
+        """
+        columns = self.resolve_columns(columns)
+        years = self._years()
+        print(f"🏛️ Export CSV de {n_scenarios:,} scénarios pour {self.parti} dans {path}...")
+        with CsvChunkWriter(path, ('Scenario', 'Annee'), columns, precision, compression, buffer_size) as writer:
+            for first, values in self.iter_scenarios(n_scenarios, chunk_size, columns=columns):
+                count = len(values)
+                keys = np.column_stack([np.repeat(np.arange(first, first + count), len(years)),
+                                        np.tile(years, count)])
+                writer.write(keys, values.reshape(count * len(years), len(columns)))
+        print(f"💾 Données sauvegardées: {path}")
+    
+    def write_ensemble_store(self, path, n_scenarios, columns=None, chunk_size=None, n_workers=None):
+        """Écrit un ensemble directement dans un fichier .npy projeté en mémoire
+        
+        Le tableau (scénario, année, métrique) est rempli par morceaux de
+        iter_scenarios, ou par tranches écrites en place par n_workers
+        processus ; seule la tranche en cours réside en mémoire. Un fichier
+        path + '.json' décrit la disposition, les colonnes et les années.
+        Le fichier n'apparaît sous son nom qu'une fois complet. Relire avec
+        open_ensemble_store.
+        """
+        columns = self.resolve_columns(columns)
+        years = self._years()
+        shape = (n_scenarios, len(years), len(columns))
+        print(f"🏛️ Écriture de {n_scenarios:,} scénarios pour {self.parti} dans {path}...")
+        
+        tmp_path = path + '.tmp'
+        store = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=shape)
+        try:
+            if n_workers:
+                # Les processus rouvrent le fichier et écrivent leur tranche en place
+                offset = store.offset
+                del store
+                slices = self._scenario_slices(n_scenarios, n_workers * 4)
+                self._check_slicing(len(slices))
+                with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                    futures = [pool.submit(_store_worker, self, tmp_path, offset, shape, first, count, columns)
+                               for first, count in slices]
+                    for future in futures:
+                        future.result()
             else:
-                base_dependency = 0.38
-                
-            noise = np.random.normal(1, 0.06)
-            dependencies.append(base_dependency * noise)
-        
-        return dependencies
-    
-    def _simulate_financial_balance(self, dates):
-        """Simule le solde financier"""
-        balances = []
-        for i, date in enumerate(dates):
-            year = date.year
+                for first, values in self.iter_scenarios(n_scenarios, chunk_size, columns=columns):
+                    store[first:first + len(values)] = values
+                store.flush()
+                del store
             
-            if year in [2002, 2007, 2012, 2017, 2022]:  # Déficits électoraux
-                base_balance = -0.15
-            elif year in [2003, 2008, 2013, 2018, 2023]:  # Redressement
-                base_balance = 0.08
-            else:
-                base_balance = 0.02  # Équilibre
-                
-            noise = np.random.normal(1, 0.10)
-            balances.append(base_balance * noise)
-        
-        return balances
+            metadata = {
+                'layout': ['scenario', 'year', 'metric'],
+                'columns': list(columns),
+                'years': years.tolist(),
+                'parti': self.parti,
+                'seed': self.seed,
+                'sampling': self.sampling,
+            }
+            with open(path + '.json', 'w', encoding='utf-8') as sidecar:
+                json.dump(metadata, sidecar, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        print(f"💾 Ensemble sauvegardé: {path}")
     
-    def _simulate_debt(self, dates):
-        """Simule l'endettement"""
-        base_debt = self.config["budget_base"] * 0.5
-        
-        debt = []
-        current_debt = base_debt
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year in [2002, 2007, 2012, 2017, 2022]:  # Augmentation dette
-                change_rate = 0.25
-            elif year in [2004, 2009, 2014, 2019, 2024]:  # Réduction dette
-                change_rate = -0.10
-            else:
-                change_rate = 0.02
-                
-            current_debt *= (1 + change_rate)
-            noise = np.random.normal(1, 0.08)
-            debt.append(current_debt * noise)
-        
-        return debt
+    def run_ensemble(self, n_scenarios, n_workers=None, columns=None):
+        """Génère un ensemble de scénarios en parallèle sur plusieurs processus
+        
+        Les scénarios sont répartis par tranches alignées sur les blocs de
+        tirage ; chaque processus écrit sa tranche directement dans un bloc de
+        mémoire partagée, sans renvoyer ses résultats par pickle. Le tableau
+        (scénario, année, métrique) obtenu est identique à celui de
+        generate_financial_data(n_scenarios, columns=columns), quel que soit
+        n_workers ; en mode 'lhs', qui ne se découpe pas, un ensemble de
+        plus d'une tranche est refusé.
+        
+        Le tableau renvoyé repose directement sur le bloc partagé, sans
+        copie : le bloc est libéré avec le dernier tableau (ou vue) qui
+        l'utilise. Pour un ensemble plus grand que la mémoire, voir
+        write_ensemble_store.
+        """
+        print(f"🏛️ Génération de {n_scenarios:,} scénarios pour {self.parti}...")
+        
+        columns = self.resolve_columns(columns)
+        n_workers = n_workers or os.cpu_count()
+        shape = (n_scenarios, len(self._years()), len(columns))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+        try:
+            # Plusieurs tranches par processus pour équilibrer la charge
+            slices = self._scenario_slices(n_scenarios, n_workers * 4)
+            self._check_slicing(len(slices))
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                futures = [pool.submit(_ensemble_worker, self, shm.name, shape, first, count, columns)
+                           for first, count in slices]
+                for future in futures:
+                    future.result()
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        
+        # Le nom du bloc n'est plus utile ; sa mémoire reste projetée jusqu'à la libération du tableau
+        shm.unlink()
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        weakref.finalize(values, shm.close).atexit = False
+        return values
     
-    def _simulate_communication_investment(self, dates):
-        """Simule l'investissement en communication"""
-        base_investment = self.config["budget_base"] * 0.08
-        
-        investment = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2010:
-                growth = 1 + 0.09 * max(0, (year - 2010)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.14)
-            investment.append(base_investment * growth * noise)
-        
-        return investment
+    def _check_slicing(self, n_slices):
+        """Refuse de découper un ensemble en plusieurs tranches en mode 'lhs'
+        
+        L'hypercube latin stratifie l'ensemble entier : chaque tranche tirée
+        à part serait un autre hypercube, et leur réunion n'en serait pas un.
+        """
+        if self.sampling == 'lhs' and n_slices > 1:
+            raise ValueError("le tirage 'lhs' stratifie l'ensemble entier et ne se génère pas par "
+                             "tranches ou par lots : utiliser generate_financial_data(n_scenarios), "
+                             "ou le tirage 'sobol'")
     
-    def _simulate_digital_investment(self, dates):
-        """Simule l'investissement numérique"""
-        base_investment = self.config["budget_base"] * 0.06
-        
-        investment = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2012:
-                growth = 1 + 0.12 * max(0, (year - 2012)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.18)
-            investment.append(base_investment * growth * noise)
-        
-        return investment
+    def _scenario_slices(self, n_scenarios, n_slices):
+        """Découpe [0, n_scenarios) en au plus n_slices tranches (début, taille) alignées sur les blocs"""
+        if n_scenarios <= 0:
+            return []
+        block_size = self.scenario_block_size
+        n_blocks = -(-n_scenarios // block_size)
+        slice_size = -(-n_blocks // n_slices) * block_size
+        return [(first, min(slice_size, n_scenarios - first))
+                for first in range(0, n_scenarios, slice_size)]
     
-    def _simulate_training_investment(self, dates):
-        """Simule l'investissement en formation"""
-        base_investment = self.config["budget_base"] * 0.04
-        
-        investment = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2008:
-                growth = 1 + 0.06 * max(0, (year - 2008)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.12)
-            investment.append(base_investment * growth * noise)
-        
-        return investment
+    @property
+    def metric_columns(self):
+        """Colonnes simulées, dans l'ordre du dernier axe des ensembles"""
+        return tuple(spec.column for spec in self.metric_specs)
     
-    def _simulate_research_investment(self, dates):
-        """Simule l'investissement en recherche"""
-        base_investment = self.config["budget_base"] * 0.03
-        
-        investment = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2015:
-                growth = 1 + 0.05 * max(0, (year - 2015)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.15)
-            investment.append(base_investment * growth * noise)
-        
-        return investment
+    def resolve_columns(self, columns=None):
+        """Colonnes à générer pour servir columns, dans l'ordre de metric_columns
+        
+        Le graphe de dépendances est celui de metric_specs : chaque colonne
+        dépend de sa propre tendance (base, tables, config[base_of]), de son
+        flux de bruit et des party_shocks qui la visent, jamais d'une autre
+        colonne. La fermeture des colonnes demandées se réduit donc à ces
+        colonnes elles-mêmes.
+        """
+        if columns is None:
+            return self.metric_columns
+        if isinstance(columns, str):
+            columns = [columns]
+        unknown = set(columns) - set(self.metric_columns)
+        if unknown:
+            raise ValueError(f"colonnes inconnues: {', '.join(sorted(unknown))}")
+        return tuple(column for column in self.metric_columns if column in columns)
     
-    def _simulate_international_investment(self, dates):
-        """Simule l'investissement international"""
-        base_investment = self.config["budget_base"] * 0.02
-        
-        investment = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year >= 2010:
-                growth = 1 + 0.04 * max(0, (year - 2010)/10)
-            else:
-                growth = 1
-                
-            noise = np.random.normal(1, 0.20)
-            investment.append(base_investment * growth * noise)
+    def _compiled_metrics(self, columns=None):
+        """Noyaux compilés des metric_specs de columns, recompilés si la liste change"""
+        columns = self.metric_columns if columns is None else tuple(columns)
+        specs = tuple(spec for spec in self.metric_specs if spec.column in columns)
+        compiled = self._compiled.get(columns)
+        if compiled is None or compiled.specs != specs:
+            compiled = self._compiled[columns] = CompiledMetrics(specs)
+        return compiled
+    
+    def _years(self):
+        """Années de l'horizon simulé"""
+        return np.arange(self.start_year, self.end_year + 1)
+    
+    def _generate_values(self, years, n_scenarios=None, first_scenario=0, columns=None, level=None,
+                         noise=None):
+        """Tableau (années, colonnes) ou (scénarios, années, colonnes) des données
+        
+        years est une suite d'années consécutives de l'horizon ; level est le
+        niveau des trajectoires composées l'année précédente (voir extend) ;
+        noise réutilise un bruit déjà tiré par _standard_noise.
+        """
+        columns = self.metric_columns if columns is None else columns
+        trend = self._compiled_metrics(columns).trend(years, self.config, origin=self.start_year, level=level)
+        
+        # Bruit multiplicatif 1 + sigma * z, écrit directement dans la
+        # disposition (..., années, métriques) du résultat
+        if noise is None:
+            noise = self._standard_noise(years, n_scenarios, first_scenario, columns)
+        values = np.multiply(self.noise_sigma_vector(columns), noise, out=np.empty(noise.shape))
+        values += 1
+        values *= trend
         
-        return investment
+        # Ajouter des tendances spécifiques à l'UMP
+        self._add_party_trends(values, years, columns)
+        return values
     
-    def _add_party_trends(self, df):
-        """Ajoute des tendances réalistes pour l'UMP"""
-        for i, row in df.iterrows():
-            year = row['Annee']
-            
-            # Création de l'UMP (2002)
-            if year == 2002:
-                df.loc[i, 'Revenus_Total'] *= 1.8
-                df.loc[i, 'Adherents'] *= 1.5
-            
-            # Réélection de Chirac (2002)
-            if year == 2002:
-                df.loc[i, 'Dons_Prives'] *= 2.2
-                df.loc[i, 'Depenses_Campagnes'] *= 2.5
-            
-            # Élection de Sarkozy (2007)
-            if year == 2007:
-                df.loc[i, 'Revenus_Total'] *= 1.4
-                df.loc[i, 'Depenses_Campagnes'] *= 2.8
-            
-            # Crise financière (2008-2009)
-            if 2008 <= year <= 2009:
-                df.loc[i, 'Dons_Prives'] *= 0.75
-                df.loc[i, 'Revenus_Total'] *= 0.90
-            
-            # Défaite présidentielle 2012
-            if year == 2012:
-                df.loc[i, 'Financement_Public'] *= 0.65
-                df.loc[i, 'Adherents'] *= 0.88
-            
-            # Affaire Bygmalion (2014)
-            if year == 2014:
-                df.loc[i, 'Dons_Prives'] *= 0.60
-                df.loc[i, 'Revenus_Total'] *= 0.85
-                df.loc[i, 'Endettement'] *= 1.4
-            
-            # Changement de nom (2015)
-            if year == 2015:
-                df.loc[i, 'Investissement_Communication'] *= 1.6
-                df.loc[i, 'Depenses_Communication'] *= 1.4
-            
-            # Primaire 2016
-            if year == 2016:
-                df.loc[i, 'Revenus_Total'] *= 1.3
-                df.loc[i, 'Depenses_Campagnes'] *= 1.8
-            
-            # Défaite présidentielle 2017
-            if year == 2017:
-                df.loc[i, 'Financement_Public'] *= 0.45
-                df.loc[i, 'Adherents'] *= 0.78
-                df.loc[i, 'Elus_Nationaux'] *= 0.35
-            
-            # COVID-19 (2020)
-            if year == 2020:
-                df.loc[i, 'Revenus_Evenements'] *= 0.3
-                df.loc[i, 'Investissement_Numérique'] *= 1.5
-            
-            # Élection présidentielle 2022
-            if year == 2022:
-                df.loc[i, 'Depenses_Campagnes'] *= 2.2
-                df.loc[i, 'Dons_Prives'] *= 1.8
+    def _ensemble_to_frame(self, values, years, first_scenario=0, dates=None, columns=None):
+        """Convertit un tableau (scénario, année ou période, métrique) en DataFrame long"""
+        n_scenarios, n_years, n_metrics = values.shape
+        columns = self.metric_columns if columns is None else columns
+        df = pd.DataFrame(values.reshape(n_scenarios * n_years, n_metrics), columns=list(columns))
+        df.insert(0, 'Annee', np.tile(years, n_scenarios))
+        if dates is not None:
+            df.insert(0, 'Date', np.tile(dates, n_scenarios))
+        df.insert(0, 'Scenario', np.repeat(np.arange(first_scenario, first_scenario + n_scenarios), n_years))
+        return df
+    
+    def _metric_stream(self, column, block, year_block, parti=None):
+        """Générateur Philox propre à un parti, une métrique et une tuile (bloc de scénarios, bloc d'années)"""
+        parti = self.parti if parti is None else parti
+        seed_sequence = np.random.SeedSequence(
+            self.seed, spawn_key=(_stream_key(parti), _stream_key(column), block, year_block))
+        return np.random.Generator(np.random.Philox(seed_sequence))
+    
+    def noise_sigma_vector(self, columns=None):
+        """Écarts-types du bruit, dans l'ordre de metric_columns"""
+        columns = self.metric_columns if columns is None else columns
+        return np.array([self.noise_sigmas.get(column, 0.0) for column in columns], dtype=float)
+    
+    def set_noise_correlation(self, correlation, columns=None):
+        """Corrèle le bruit des métriques selon une matrice de corrélation
+        
+        correlation est un DataFrame carré indexé par colonnes (par exemple
+        le résultat de estimate_noise_correlation), ou un tableau accompagné
+        de columns ; None revient à des bruits indépendants. Les métriques
+        concernées doivent avoir un bruit (sigma non nul), et la matrice être
+        symétrique, de diagonale unité et définie positive.
+        """
+        if correlation is None:
+            self.noise_correlation = None
+            return
+        if isinstance(correlation, pd.DataFrame):
+            columns = tuple(correlation.columns)
+            matrix = correlation.loc[list(columns), list(columns)].to_numpy(dtype=float)
+        else:
+            columns = tuple(columns)
+            matrix = np.asarray(correlation, dtype=float)
+        
+        if matrix.shape != (len(columns), len(columns)):
+            raise ValueError(f"matrice de corrélation de forme {matrix.shape} pour {len(columns)} colonnes")
+        unknown = set(columns) - set(self.metric_columns)
+        if unknown:
+            raise ValueError(f"colonnes inconnues: {', '.join(sorted(unknown))}")
+        silent = [column for column in columns if not self.noise_sigmas.get(column, 0.0)]
+        if silent:
+            raise ValueError(f"colonnes sans bruit: {', '.join(silent)}")
+        if not np.allclose(matrix, matrix.T) or not np.allclose(np.diag(matrix), 1):
+            raise ValueError("la matrice de corrélation doit être symétrique, de diagonale unité")
+        
+        # Colonnes dans l'ordre de metric_columns, pour un facteur indépendant de l'ordre fourni
+        order = sorted(range(len(columns)), key=lambda i: self.metric_columns.index(columns[i]))
+        try:
+            factor = np.linalg.cholesky(matrix[np.ix_(order, order)])
+        except np.linalg.LinAlgError:
+            raise ValueError("la matrice de corrélation n'est pas définie positive") from None
+        self.noise_correlation = (tuple(columns[i] for i in order), factor)
+    
+    def estimate_noise_correlation(self, history, columns=None):
+        """Estime la corrélation du bruit à partir de données historiques
+        
+        history est un DataFrame annuel (colonne Annee et métriques, une ou
+        plusieurs lignes par année, par exemple un export en layout long).
+        Chaque valeur est rapportée à la tendance déterministe et aux chocs de
+        son année ; la corrélation des écarts relatifs, renvoyée en DataFrame,
+        se passe directement à set_noise_correlation.
+        """
+        columns = [column for column in self.resolve_columns(columns)
+                   if column in history and self.noise_sigmas.get(column, 0.0)]
+        years = history['Annee'].to_numpy()
+        if years.min() < self.start_year:
+            raise ValueError(f"l'historique doit commencer au plus tôt en {self.start_year}")
+        if len(history) < 3:
+            raise ValueError("au moins trois observations sont nécessaires")
+        
+        span = np.arange(self.start_year, years.max() + 1)
+        expected = self._compiled_metrics(columns).trend(span, self.config, origin=self.start_year)
+        expected = expected * self._shock_factors(span, columns)
+        residuals = history[columns].to_numpy(dtype=float) / expected[years - self.start_year] - 1
+        return pd.DataFrame(np.corrcoef(residuals, rowvar=False), index=columns, columns=columns)
+    
+    def _standard_noise(self, years, n_scenarios=None, first_scenario=0, columns=None, parti=None):
+        """Bruit N(0, 1) de forme (..., années, colonnes), corrélé selon noise_correlation
+        
+        Le facteur de Cholesky est appliqué en un produit matriciel sur tous
+        les couples (scénario, année). Une colonne corrélée dépend des tirages
+        des colonnes qui la précèdent dans le facteur : ceux-ci sont tirés
+        aussi, puis écartés du résultat.
+        """
+        columns = self.metric_columns if columns is None else tuple(columns)
+        if self.noise_correlation is not None:
+            correlated, factor = self.noise_correlation
+            needed = [correlated.index(column) for column in columns if column in correlated]
+        if self.noise_correlation is None or not needed:
+            return self._independent_noise(years, n_scenarios, first_scenario, columns, parti)
+        
+        correlated = correlated[:max(needed) + 1]
+        factor = factor[:len(correlated), :len(correlated)]
+        drawn = tuple(dict.fromkeys([*columns, *correlated]))
+        noise = self._independent_noise(years, n_scenarios, first_scenario, drawn, parti)
+        index = [drawn.index(column) for column in correlated]
+        noise[..., index] = noise[..., index] @ factor.T
+        if drawn == columns:
+            return noise
+        return noise[..., [drawn.index(column) for column in columns]]
+    
+    def _independent_noise(self, years, n_scenarios, first_scenario, columns, parti):
+        """Bruit N(0, 1) indépendant de forme (..., années, colonnes), selon sampling
+        
+        En mode antithétique, les scénarios vont par paires (2k, 2k + 1) : le
+        second reprend le tirage du premier au signe près, et le scénario s
+        reste le même quel que soit le découpage en tranches.
+        """
+        draw = self.draw_noise_matrix if self.sampling == 'random' else self._qmc_normal
+        if not self.antithetic or n_scenarios is None:
+            return draw(years, n_scenarios, first_scenario, columns, parti).T
+        
+        scenarios = np.arange(first_scenario, first_scenario + n_scenarios)
+        first_pair = first_scenario // 2
+        n_pairs = (scenarios[-1] // 2 - first_pair + 1) if n_scenarios else 0
+        pairs = draw(years, n_pairs, first_pair, columns, parti).T
+        noise = pairs[scenarios // 2 - first_pair]
+        noise[scenarios % 2 == 1] *= -1
+        return noise
+    
+    def draw_noise_matrix(self, years, n_scenarios=None, first_scenario=0, columns=None, parti=None):
+        """Tire d'un coup le bloc N(0, 1) de forme (métriques, années[, scénarios])
+        
+        Les métriques sans bruit (sigma nul) gardent des zéros et ne
+        consomment aucun tirage ; columns limite le tirage à ces métriques.
+        Les tirages sont indépendants : la corrélation éventuelle est
+        appliquée par _standard_noise.
+        """
+        columns = self.metric_columns if columns is None else columns
+        count = 1 if n_scenarios is None else n_scenarios
+        draws = np.zeros((len(columns), len(years), count))
+        first_year = int(years[0]) - self.start_year if len(years) else 0
+        for m, column in enumerate(columns):
+            if self.noise_sigmas.get(column, 0.0):
+                self._standard_normal(column, draws[m], first_scenario, first_year, parti)
+        return draws[:, :, 0] if n_scenarios is None else draws
+    
+    def _qmc_normal(self, years, n_scenarios=None, first_scenario=0, columns=None, parti=None):
+        """Bloc N(0, 1) (métriques, années[, scénarios]) tiré par scipy.stats.qmc
+        
+        Chaque scénario est un point de dimension (métriques bruitées) x
+        (années de l'horizon), ramené à une loi normale par la fonction
+        quantile ; la position d'une métrique dans le point ne dépend pas de
+        columns. Les suites de Sobol et de Halton (brouillées) sont
+        reprises au point first_scenario, si bien qu'une tranche reste celle
+        de l'ensemble complet ; l'hypercube latin stratifie les n_scenarios
+        scénarios demandés ensemble et ne se tire qu'à partir du scénario 0
+        (voir _check_slicing). Contrairement au mode 'random', le bruit
+        dépend de la longueur de l'horizon.
+        """
+        columns = self.metric_columns if columns is None else columns
+        parti = self.parti if parti is None else parti
+        count = 1 if n_scenarios is None else n_scenarios
+        noisy = [column for column in self.metric_columns if self.noise_sigmas.get(column, 0.0)]
+        n_years = self.end_year - self.start_year + 1
+        if len(years) and (years[0] < self.start_year or years[-1] > self.end_year):
+            raise ValueError(f"le tirage {self.sampling!r} ne couvre que l'horizon "
+                             f"{self.start_year}-{self.end_year} (extend n'est pas pris en charge)")
+        dimension = self._check_qmc_dimension()
+        
+        rng = np.random.default_rng(np.random.SeedSequence(
+            self.seed, spawn_key=(_stream_key(parti), _stream_key(self.sampling))))
+        if self.sampling == 'lhs':
+            if first_scenario:
+                self._check_slicing(2)
+            points = qmc.LatinHypercube(dimension, seed=rng).random(count)
+        else:
+            engine = (qmc.Sobol if self.sampling == 'sobol' else qmc.Halton)(dimension, seed=rng)
+            if first_scenario:
+                engine.fast_forward(first_scenario)
+            points = engine.random(count)
+        
+        # Les quantiles 0 et 1 (possibles sans brouillage) donneraient des infinis
+        tiny = np.finfo(float).tiny
+        points = norm.ppf(np.clip(points, tiny, 1 - np.finfo(float).epsneg))
+        points = points.reshape(count, len(noisy), n_years)[:, :, years - self.start_year]
+        
+        draws = np.zeros((len(columns), len(years), count))
+        for m, column in enumerate(columns):
+            if column in noisy:
+                draws[m] = points[:, noisy.index(column)].T
+        return draws[:, :, 0] if n_scenarios is None else draws
+    
+    def _check_qmc_dimension(self):
+        """Dimension des points quasi-Monte Carlo, validée selon le tirage
+        
+        La suite de Sobol de scipy est limitée à Sobol.MAXDIM dimensions ; le
+        brouillage de Halton demande une mémoire quadratique en la dimension
+        (plus de 2 Go à 4000), d'où la limite de HALTON_MAX_DIMENSION.
+        """
+        n_noisy = sum(1 for column in self.metric_columns if self.noise_sigmas.get(column, 0.0))
+        n_years = self.end_year - self.start_year + 1
+        dimension = max(1, n_noisy * n_years)
+        max_dimension = {'sobol': getattr(qmc.Sobol, 'MAXDIM', 21201),
+                         'halton': HALTON_MAX_DIMENSION}.get(self.sampling)
+        if max_dimension is not None and dimension > max_dimension:
+            raise ValueError(f"le tirage {self.sampling!r} est limité à {max_dimension} dimensions : "
+                             f"{n_noisy} métriques bruitées sur {n_years} ans en demandent {dimension} "
+                             f"(raccourcir l'horizon ou utiliser le tirage 'random')")
+        return dimension
+    
+    def convergence_report(self, scenario_counts=(64, 256, 1024), samplings=SAMPLINGS, n_replicates=8):
+        """Compare la précision des modes de tirage sur les moyennes d'ensemble
+        
+        Pour chaque mode et chaque nombre de scénarios, n_replicates ensembles
+        indépendants (graines dérivées de self.seed) estiment le revenu moyen
+        (Revenus_Total sur toutes les années) et l'endettement final moyen.
+        L'erreur type est l'écart-type de l'estimation entre répliques ;
+        speedup est le rapport des variances avec le mode 'random', soit le
+        facteur de scénarios économisés à précision égale. La largeur de
+        l'intervalle de confiance à 95 % vaut 2 * 1.96 * std_error.
+        """
+        # Estimateurs, appliqués au tableau (scénarios, années) de leur colonne
+        targets = {
+            'Revenus_Total': lambda paths: paths.mean(),
+            'Endettement': lambda paths: paths[:, -1].mean(),
+        }
+        columns = self.resolve_columns(list(targets))
+        entropy = self._entropy()
+        rows = []
+        for sampling in samplings:
+            for n_scenarios in scenario_counts:
+                estimates = {column: [] for column in targets}
+                for replicate in range(n_replicates):
+                    analyzer = copy.copy(self)
+                    analyzer.sampling = sampling
+                    analyzer.seed = [*entropy, replicate]
+                    values = analyzer._generate_values(self._years(), n_scenarios, 0, columns)
+                    for column, estimator in targets.items():
+                        estimates[column].append(estimator(values[..., columns.index(column)]))
+                for column in targets:
+                    rows.append({'sampling': sampling, 'n_scenarios': n_scenarios, 'metric': column,
+                                 'mean': np.mean(estimates[column]),
+                                 'std_error': np.std(estimates[column], ddof=1)})
+        
+        report = pd.DataFrame(rows)
+        reference = report[report['sampling'] == 'random'].set_index(['n_scenarios', 'metric'])['std_error']
+        key = pd.MultiIndex.from_frame(report[['n_scenarios', 'metric']])
+        report['speedup'] = (reference.reindex(key).to_numpy() / report['std_error']) ** 2
+        return report
+    
+    def _standard_normal(self, column, out, first_scenario=0, first_year=0, parti=None):
+        """Remplit out (années, scénarios) de tirages N(0, 1) d'une métrique
+        
+        Dans chaque tuile, les scénarios sont tirés l'un après l'autre sur
+        toutes les années du bloc, toujours complet : le scénario s reçoit
+        les mêmes tirages quel que soit le nombre de scénarios demandés, le
+        découpage en lots ou la longueur de l'horizon. first_year est
+        l'indice (depuis start_year) de la première ligne de out, parti le
+        parti dont on tire les flux (self.parti par défaut).
+        """
+        n_years, count = out.shape
+        block_size, year_block_size = self.scenario_block_size, self.year_block_size
+        stop = first_scenario + count
+        stop_year = first_year + n_years
+        for block in range(first_scenario // block_size, (stop - 1) // block_size + 1):
+            start = max(first_scenario, block * block_size) - block * block_size
+            end = min(stop, (block + 1) * block_size) - block * block_size
+            columns = slice(block * block_size + start - first_scenario, block * block_size + end - first_scenario)
+            for year_block in range(first_year // year_block_size, -(-stop_year // year_block_size)):
+                tile_start = max(first_year, year_block * year_block_size)
+                tile_stop = min(stop_year, (year_block + 1) * year_block_size)
+                offset = year_block * year_block_size
+                draws = self._metric_stream(column, block, year_block, parti).standard_normal((end, year_block_size))
+                out[tile_start - first_year:tile_stop - first_year, columns] = \
+                    draws[start:end, tile_start - offset:tile_stop - offset].T
+    
+    def _shock_factors(self, years, columns):
+        """Matrice (années, colonnes) des facteurs multiplicatifs de party_shocks"""
+        return shock_factors(years, columns, [self.party_shocks])[0]
+    
+    def _add_party_trends(self, values, years, columns=None):
+        """Ajoute des tendances réalistes pour l'UMP
+        
+        values est un tableau (..., années, colonnes), modifié sur place par
+        une seule multiplication diffusée sur tous les scénarios.
+        """
+        columns = self.metric_columns if columns is None else columns
+        values *= self._shock_factors(years, columns)
     
     def create_financial_analysis(self, df):
         """Crée une analyse complète des finances de l'UMP"""
+        if 'Scenario' in df and df['Scenario'].nunique() > 1:
+            raise ValueError("l'analyse porte sur un seul scénario : sélectionner un scénario de l'ensemble")
         plt.style.use('seaborn-v0_8')
         fig = plt.figure(figsize=(20, 24))
         
@@ -1023,21 +2520,175 @@ class UMPFinanceAnalyzer:
         print("• Améliorer la transparence financière")
         print("• Développer les partenariats avec la société civile")
 
-def main():
-    """Fonction principale pour l'analyse de l'UMP"""
+class MultiPartyAnalyzer:
+    """Génère en un appel les données de plusieurs partis, le long d'un axe parti
+    
+    parties est une suite de PartyProfile ; les autres arguments configurent
+    le générateur partagé (un UMPFinanceAnalyzer, dans self.analyzer : graine,
+    horizon, métriques, tirage). Les tendances de tous les partis sont
+    calculées en une passe sur une base (partis, métriques), puis le bruit et
+    les chocs sont appliqués par opérations diffusées ; seul le tirage reste
+    propre à chaque parti, chacun ayant ses flux Philox.
+    
+    Chaque parti part de sa base l'année de sa création (ou en start_year
+    s'il existait déjà) : sa croissance linéaire compte depuis cette année
+    et ses trajectoires composées (Endettement) y commencent. Un parti
+    existant dès start_year obtient exactement les mêmes valeurs que
+    l'analyseur d'un seul parti de même configuration et de même graine.
+    """
+    
+    def __init__(self, parties, seed=None, **kwargs):
+        self.analyzer = UMPFinanceAnalyzer(seed=seed, **kwargs)
+        self.parties = tuple(parties)
+        if len({party.parti for party in self.parties}) != len(self.parties):
+            raise ValueError("chaque parti doit avoir un nom distinct")
+    
+    @property
+    def party_names(self):
+        """Noms des partis, dans l'ordre du premier axe des résultats"""
+        return tuple(party.parti for party in self.parties)
+    
+    def generate_party_data(self, n_scenarios=None, layout='array', first_scenario=0, columns=None):
+        """Génère les données annuelles de tous les partis
+        
+        layout='array' renvoie un tableau (parti, année, métrique), ou (parti,
+        scénario, année, métrique) avec n_scenarios ; layout='long' un
+        DataFrame avec une colonne Parti en tête. Les années antérieures à la
+        création d'un parti valent NaN.
+        """
+        engine = self.analyzer
+        engine._check_output_options(layout, 'Y')
+        columns = engine.resolve_columns(columns)
+        print(f"🏛️ Génération des données financières pour {len(self.parties)} partis...")
+        
+        years = engine._years()
+        compiled = engine._compiled_metrics(columns)
+        bases = np.array([compiled.base_vector(party.config) for party in self.parties])
+        origins = np.maximum([party.creation_year for party in self.parties], engine.start_year)
+        trend = compiled.trend_from_base(years, bases, origins)
+        
+        count = 1 if n_scenarios is None else n_scenarios
+        noise = np.stack([engine._standard_noise(years, count, first_scenario, columns, party.parti)
+                          for party in self.parties])
+        values = np.multiply(engine.noise_sigma_vector(columns), noise, out=np.empty(noise.shape))
+        values += 1
+        values *= trend[:, None]
+        values *= shock_factors(years, columns, [party.shocks for party in self.parties])[:, None]
+        values[np.broadcast_to(self._before_creation(years)[:, None, :, None], values.shape)] = np.nan
+        if n_scenarios is None:
+            values = values[:, 0]
+        
+        if layout == 'array':
+            return values
+        frames = []
+        for p, party in enumerate(self.parties):
+            if n_scenarios is None:
+                df = pd.DataFrame(values[p], columns=list(columns))
+                df.insert(0, 'Annee', years)
+            else:
+                df = engine._ensemble_to_frame(values[p], years, first_scenario, columns=columns)
+            df.insert(0, 'Parti', party.parti)
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+    
+    def _before_creation(self, years):
+        """Masque (partis, années) des années antérieures à la création de chaque parti"""
+        creation = np.array([party.creation_year for party in self.parties])
+        return years < creation[:, None]
+
+def _chunk_worker(analyzer, first_scenario, n_scenarios, columns):
+    """Génère un morceau de scénarios pour iter_scenarios"""
+    return analyzer._generate_values(analyzer._years(), n_scenarios, first_scenario, columns)
+
+def _summary_worker(analyzer, first_scenario, n_scenarios, columns, chunk_size, summary):
+    """Résume une tranche de scénarios pour summarize_ensemble"""
+    chunk_size = chunk_size or analyzer.scenario_block_size
+    years = analyzer._years()
+    for first in range(first_scenario, first_scenario + n_scenarios, chunk_size):
+        count = min(chunk_size, first_scenario + n_scenarios - first)
+        summary.update(analyzer._generate_values(years, count, first, columns))
+    return summary
+
+def _store_worker(analyzer, path, offset, shape, first_scenario, n_scenarios, columns):
+    """Génère une tranche de scénarios directement dans le fichier de write_ensemble_store"""
+    store = np.memmap(path, dtype=np.float64, mode='r+', offset=offset, shape=shape)
+    store[first_scenario:first_scenario + n_scenarios] = analyzer._generate_values(
+        analyzer._years(), n_scenarios, first_scenario, columns)
+    store.flush()
+    del store
+
+def _ensemble_worker(analyzer, shm_name, shape, first_scenario, n_scenarios, columns=None):
+    """Génère une tranche de scénarios directement dans la mémoire partagée"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        out[first_scenario:first_scenario + n_scenarios] = analyzer._generate_values(
+            analyzer._years(), n_scenarios, first_scenario, columns)
+        del out
+    finally:
+        shm.close()
+
+def _read_text(path):
+    """Contenu d'un petit fichier texte, ou None s'il n'existe pas"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def main(seed=None, cache_dir='.ump_cache', formats=('csv', 'parquet'), data_file=None, scenario=None):
+    """Fonction principale pour l'analyse de l'UMP
+    
+    Les données sont exportées dans chacun des formats de DATASET_WRITERS
+    listés dans formats. Avec une graine fixée, elles sont mises en cache
+    dans cache_dir et un export n'est réécrit que s'il manque ou si les
+    données ont été régénérées. La clé de cache des données exportées est
+    gardée à côté de chaque export (fichier .key) : un export produit par
+    d'autres données (autre graine, autre version du code) est toujours
+    réécrit. data_file relit un export précédent au lieu de générer les
+    données ; s'il contient un ensemble de scénarios, scenario désigne
+    celui à analyser.
+    """
     print("🏛️ ANALYSE DES FINANCES DE L'UMP/LES RÉPUBLICAINS (2002-2025)")
     print("=" * 60)
     
     # Initialiser l'analyseur
-    analyzer = UMPFinanceAnalyzer()
+    analyzer = UMPFinanceAnalyzer(seed=seed)
     
-    # Générer les données
-    financial_data = analyzer.generate_financial_data()
+    if data_file is not None:
+        # Relire un export précédent (d'un ensemble, le seul scénario demandé)
+        ensemble = data_file.endswith('.npy') or 'Scenario' in dataset_columns(data_file)
+        if ensemble and scenario is None:
+            raise ValueError(f"{data_file}: ensemble de scénarios, préciser le scénario à analyser (scenario=...)")
+        financial_data = analyzer.load_financial_data(data_file, scenarios=None if scenario is None else [scenario])
+        if ensemble:
+            if financial_data.empty:
+                raise ValueError(f"{data_file}: scénario {scenario} absent")
+            financial_data = financial_data.drop(columns='Scenario')
+        analyzer.start_year = int(financial_data['Annee'].min())
+        analyzer.end_year = int(financial_data['Annee'].max())
+        print(f"📂 Données relues: {data_file}")
+        formats = ()
+    else:
+        # Générer les données (sans graine, chaque exécution est un nouveau tirage : rien à mettre en cache)
+        cache = DatasetCache(cache_dir) if seed is not None else None
+        financial_data = analyzer.generate_financial_data(cache=cache)
     
     # Sauvegarder les données
-    output_file = 'UMP_financial_data_2002_2025.csv'
-    financial_data.to_csv(output_file, index=False)
-    print(f"💾 Données sauvegardées: {output_file}")
+    key = cache.last_key if data_file is None and cache is not None else None
+    for format in formats:
+        output_file = f'UMP_financial_data_{analyzer.start_year}_{analyzer.end_year}{DATASET_WRITERS[format][0]}'
+        key_file = output_file + '.key'
+        if key is not None and os.path.exists(output_file) and _read_text(key_file) == key:
+            print(f"💾 Données inchangées: {output_file}")
+            continue
+        write_dataset(financial_data, output_file, format)
+        if key is not None:
+            with open(key_file, 'w', encoding='utf-8') as f:
+                f.write(key)
+        elif os.path.exists(key_file):
+            os.unlink(key_file)
+        print(f"💾 Données sauvegardées: {output_file}")
     
     # Aperçu des données
     print("\n👀 Aperçu des données:")
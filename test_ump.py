@@ -0,0 +1,223 @@
+"""Tests de Ump.py
+
+Les invariants d'identité bit à bit : les données sont les mêmes quelle que
+soit la façon de les obtenir (prolongement de l'horizon, tranche de
+scénarios, sous-ensemble de colonnes). Les allers-retours par le cache et
+les exports rendent les données telles qu'elles ont été écrites.
+"""
+import os
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Ump import (METRIC_SPECS, DatasetCache, MultiPartyAnalyzer, PartyProfile, TrackedStatistic,
+                 UMPFinanceAnalyzer, main, read_dataset, write_dataset)
+
+
+SEED = 20240611
+
+
+@pytest.mark.parametrize('n_scenarios', [None, 5])
+def test_extend_equals_direct_generation(n_scenarios):
+    layout = 'long' if n_scenarios else 'array'
+    short = UMPFinanceAnalyzer(seed=SEED, end_year=2015).generate_financial_data(n_scenarios, layout)
+    extended = UMPFinanceAnalyzer(seed=SEED, end_year=2015).extend(short, 2030)
+    direct = UMPFinanceAnalyzer(seed=SEED, end_year=2030).generate_financial_data(n_scenarios, layout)
+    if n_scenarios:
+        # Les nouvelles années suivent le bloc existant : comparer dans l'ordre (scénario, année)
+        extended = extended.sort_values(['Scenario', 'Annee'], kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(extended, direct, check_exact=True)
+
+
+@pytest.mark.filterwarnings('ignore:The balance properties of Sobol')
+@pytest.mark.parametrize('sampling', ['random', 'sobol'])
+def test_slices_equal_full_ensemble(sampling):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, scenario_block_size=64, sampling=sampling)
+    full = analyzer.generate_financial_data(200)
+    for first, count in [(0, 64), (64, 100), (150, 50)]:
+        part = analyzer.generate_financial_data(count, first_scenario=first)
+        np.testing.assert_array_equal(part, full[first:first + count])
+
+
+def test_run_ensemble_equals_serial_generation():
+    analyzer = UMPFinanceAnalyzer(seed=SEED, scenario_block_size=64)
+    values = analyzer.run_ensemble(200, n_workers=2)
+    np.testing.assert_array_equal(values, analyzer.generate_financial_data(200))
+    # Le tableau rendu est le bloc partagé lui-même ; une vue le garde en vie
+    assert not values.flags.owndata
+    view = values[100:]
+    del values
+    np.testing.assert_array_equal(view, analyzer.generate_financial_data(100, first_scenario=100))
+    assert analyzer.run_ensemble(0, n_workers=2).shape == (0, len(analyzer._years()), len(analyzer.metric_columns))
+
+
+@pytest.mark.parametrize('sampling', ['random', 'sobol'])
+def test_column_subset_equals_full_columns(sampling):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, sampling=sampling)
+    full = analyzer.generate_financial_data(32)
+    for subset in [['Endettement'], ['Adherents', 'Solde_Financier']]:
+        columns = analyzer.resolve_columns(subset)
+        positions = [analyzer.metric_columns.index(column) for column in columns]
+        part = analyzer.generate_financial_data(32, columns=subset)
+        np.testing.assert_array_equal(part, full[..., positions])
+
+
+def test_iter_scenarios_equals_full_ensemble():
+    analyzer = UMPFinanceAnalyzer(seed=SEED, scenario_block_size=64)
+    full = analyzer.generate_financial_data(200)
+    chunks = np.concatenate([values for _, values in analyzer.iter_scenarios(200, chunk_size=48)])
+    np.testing.assert_array_equal(chunks, full)
+    chunks = np.concatenate([values for _, values in analyzer.iter_scenarios(200, chunk_size=48, n_workers=2)])
+    np.testing.assert_array_equal(chunks, full)
+
+
+@pytest.mark.parametrize('sampling', ['sobol', 'halton', 'lhs'])
+def test_extend_rejects_quasi_monte_carlo(sampling):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, end_year=2015, sampling=sampling)
+    with pytest.raises(ValueError):
+        analyzer.extend(analyzer.generate_financial_data(), 2030)
+
+
+def test_lhs_rejects_sliced_generation():
+    analyzer = UMPFinanceAnalyzer(seed=SEED, scenario_block_size=64, sampling='lhs')
+    with pytest.raises(ValueError):
+        analyzer.generate_financial_data(64, first_scenario=64)
+    with pytest.raises(ValueError):
+        list(analyzer.iter_scenarios(200, chunk_size=64))
+
+
+def test_empty_horizon_is_rejected():
+    with pytest.raises(ValueError):
+        UMPFinanceAnalyzer(seed=SEED, end_year=2001)
+
+
+def test_cache_round_trip_and_eviction(tmp_path):
+    analyzer = UMPFinanceAnalyzer(seed=SEED)
+    cache = DatasetCache(str(tmp_path), max_bytes=10**9)
+    frame = analyzer.generate_financial_data(cache=cache)
+    assert not cache.last_hit
+    pd.testing.assert_frame_equal(analyzer.generate_financial_data(cache=cache), frame, check_exact=True)
+    assert cache.last_hit
+    values = analyzer.generate_financial_data(8, cache=cache)
+    np.testing.assert_array_equal(analyzer.generate_financial_data(8, cache=cache), values)
+    
+    # Une écriture interrompue laisse un .tmp : supprimé une fois périmé
+    stale = tmp_path / 'interrompu.tmp'
+    stale.write_bytes(b'x' * 100)
+    os.utime(stale, (0, 0))
+    cache.max_bytes = 0
+    cache.put('vide', np.zeros(1))
+    assert not stale.exists()
+    assert not list(tmp_path.glob('*.npz'))
+    assert cache.get('vide') is None and not cache.last_hit
+
+
+def test_extend_keeps_column_types(tmp_path):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, end_year=2015)
+    path = str(tmp_path / 'ensemble.parquet')
+    write_dataset(analyzer.generate_financial_data(3, layout='long'), path)
+    loaded = analyzer.load_financial_data(path, metric_dtype='float32')
+    extended = analyzer.extend(loaded, 2020)
+    pd.testing.assert_series_equal(extended.dtypes, loaded.dtypes)
+    pd.testing.assert_frame_equal(extended.iloc[:len(loaded)], loaded, check_exact=True)
+    direct = UMPFinanceAnalyzer(seed=SEED, end_year=2020).generate_financial_data(3, layout='long')
+    extended = extended.sort_values(['Scenario', 'Annee'], kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(extended, direct.astype(loaded.dtypes), check_exact=True)
+
+
+def test_extend_rejects_sub_annual_data():
+    analyzer = UMPFinanceAnalyzer(seed=SEED, end_year=2015)
+    with pytest.raises(ValueError):
+        analyzer.extend(analyzer.generate_financial_data(freq='M'), 2020)
+
+
+def test_party_batch_matches_single_party_runs():
+    analyzer = UMPFinanceAnalyzer(seed=SEED)
+    parties = MultiPartyAnalyzer([analyzer.party_profile(), PartyProfile('PS', 25, 200000, 2012)], seed=SEED)
+    values = parties.generate_party_data(16)
+    np.testing.assert_array_equal(values[0], analyzer.generate_financial_data(16))
+    
+    # Sans bruit, un parti créé en cours d'horizon suit la tendance d'un analyseur qui commence à sa création
+    specs = [replace(spec, sigma=0.0) for spec in METRIC_SPECS]
+    late = MultiPartyAnalyzer([PartyProfile('PS', 25, 200000, 2012)], seed=SEED, metric_specs=specs)
+    single = UMPFinanceAnalyzer(seed=SEED, metric_specs=specs, start_year=2012)
+    single.party_shocks = []
+    trend = late.generate_party_data()[0]
+    assert np.isnan(trend[:10]).all()
+    np.testing.assert_array_equal(trend[10:], single.generate_financial_data().to_numpy()[:, 1:])
+
+
+def test_run_until_converged_tracks_requested_statistics():
+    analyzer = UMPFinanceAnalyzer(seed=SEED, end_year=2010)
+    median = TrackedStatistic('Adherents', 'quantile', tolerance=0.05, q=0.5)
+    report = analyzer.run_until_converged([median], batch_size=64, min_scenarios=64)
+    assert set(report['statistic']) == {'Adherents P50'}
+    assert report['converged'].all()
+    empty = analyzer.run_until_converged(max_scenarios=0)
+    assert empty['estimate'].isna().all() and not empty['converged'].any()
+
+
+@pytest.mark.parametrize('name', ['data.csv', 'data.csv.gz', 'data.csv.zst', 'data.parquet', 'data.feather',
+                                  'data.arrow'])
+def test_dataset_round_trip(tmp_path, name):
+    df = UMPFinanceAnalyzer(seed=SEED).generate_financial_data(6, layout='long')
+    path = str(tmp_path / name)
+    write_dataset(df, path)
+    pd.testing.assert_frame_equal(read_dataset(path), df, check_exact=True)
+    subset = read_dataset(path, columns=['Annee', 'Endettement'], scenarios=[2, 3])
+    expected = df.loc[df['Scenario'].isin([2, 3]), ['Annee', 'Endettement']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(subset, expected, check_exact=True)
+
+
+def test_compressed_suffix_is_csv_only(tmp_path):
+    df = UMPFinanceAnalyzer(seed=SEED).generate_financial_data()
+    with pytest.raises(ValueError):
+        write_dataset(df, str(tmp_path / 'data.parquet.zst'))
+
+
+@pytest.mark.parametrize('name, compression', [('data.csv', None), ('data.csv.gz', 'gzip'),
+                                               ('data.csv.zst', 'zstd')])
+def test_export_csv_round_trip(tmp_path, name, compression):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, scenario_block_size=64)
+    path = str(tmp_path / name)
+    analyzer.export_csv(path, 150, columns=['Endettement'], chunk_size=64, compression=compression)
+    expected = analyzer.generate_financial_data(150, layout='long', columns=['Endettement'])
+    pd.testing.assert_frame_equal(read_dataset(path), expected, check_exact=True)
+
+
+@pytest.mark.parametrize('name', ['data.csv', 'data.parquet', 'data.npy'])
+def test_load_financial_data_round_trip(tmp_path, name):
+    analyzer = UMPFinanceAnalyzer(seed=SEED)
+    path = str(tmp_path / name)
+    if name.endswith('.npy'):
+        analyzer.write_ensemble_store(path, 4)
+    else:
+        write_dataset(analyzer.generate_financial_data(4, layout='long'), path)
+    schema = analyzer.export_schema('float32')
+    loaded = analyzer.load_financial_data(path, columns=['Endettement'], scenarios=[1, 2], metric_dtype='float32')
+    assert {column: str(kind) for column, kind in loaded.dtypes.items()} == \
+        {column: schema[column] for column in loaded.columns}
+    expected = analyzer.generate_financial_data(2, layout='long', first_scenario=1, columns=['Endettement'])
+    pd.testing.assert_frame_equal(loaded, expected.astype(loaded.dtypes), check_exact=True)
+
+
+@pytest.mark.parametrize('name', ['monthly.csv', 'monthly.parquet'])
+def test_load_financial_data_keeps_date_resolution(tmp_path, name):
+    analyzer = UMPFinanceAnalyzer(seed=SEED, end_year=2004)
+    monthly = analyzer.generate_financial_data(freq='M')
+    path = str(tmp_path / name)
+    write_dataset(monthly, path)
+    loaded = analyzer.load_financial_data(path)
+    assert loaded['Date'].dtype == np.dtype('datetime64[ns]')
+    pd.testing.assert_series_equal(loaded['Date'], monthly['Date'].astype('datetime64[ns]'))
+
+
+def test_main_requires_a_scenario_for_ensembles(tmp_path):
+    path = str(tmp_path / 'ensemble.parquet')
+    write_dataset(UMPFinanceAnalyzer(seed=SEED).generate_financial_data(3, layout='long'), path)
+    with pytest.raises(ValueError):
+        main(data_file=path)
+    with pytest.raises(ValueError):
+        main(data_file=path, scenario=7)